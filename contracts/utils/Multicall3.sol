@@ -0,0 +1,47 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.20;
+
+/**
+ * Minimal subset of Multicall3 (https://github.com/mds1/multicall), used to
+ * aggregate read-only calls into a single eth_call.
+ * Deployed at 0xcA11bde05977b3631167028862bE2a173976CA11 on local nodes.
+ */
+contract Multicall3 {
+
+    struct Call3 {
+        address target;
+        bool allowFailure;
+        bytes callData;
+    }
+
+    struct Result {
+        bool success;
+        bytes returnData;
+    }
+
+    /**
+     * Aggregate calls, reverting if a call that does not allow failure fails.
+     * @param calls - the calls to make.
+     * @return returnData - the success flag and return data of each call.
+     */
+    function aggregate3(
+        Call3[] calldata calls
+    ) public payable returns (Result[] memory returnData) {
+        uint256 length = calls.length;
+        returnData = new Result[](length);
+        for (uint256 i = 0; i < length; i++) {
+            Call3 calldata call = calls[i];
+            Result memory result = returnData[i];
+            (result.success, result.returnData) = call.target.call(call.callData);
+            require(call.allowFailure || result.success, "Multicall3: call failed");
+        }
+    }
+
+    /**
+     * Get the ETH balance of an address.
+     * @param addr - the address to get the balance of.
+     */
+    function getEthBalance(address addr) public view returns (uint256 balance) {
+        balance = addr.balance;
+    }
+}
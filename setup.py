@@ -1,5 +1,15 @@
+from pathlib import Path
+
 from setuptools import find_packages, setup
 
+
+def read_long_description() -> str:
+    try:
+        return Path(__file__).with_name("README.md").read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return ""
+
+
 setup(
     name="eip-4337",
     version="0.1.0",
@@ -8,7 +18,7 @@ setup(
     author="Stuart Reed",
     author_email="stuart.reed@ethereum.org",
     description="A development tool for learning about EIP-4337 Account Abstraction",
-    long_description=open("README.md").read(),
+    long_description=read_long_description(),
     long_description_content_type="text/markdown",
     url="https://github.com/reedsa/eip-4337-cli",
     classifiers=[
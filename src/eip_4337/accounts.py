@@ -1,11 +1,135 @@
-from typing import Dict, cast
+import functools
+import time
+from typing import Dict, List, Optional, Tuple, cast
 
 from eth_account.signers.local import LocalAccount
 from eth_typing import ChecksumAddress
+from hexbytes import HexBytes
 from web3 import Web3
-from web3.types import RPCEndpoint
+from web3.exceptions import Web3RPCError, Web3TypeError
+from web3.types import RPCEndpoint, TxParams, TxReceipt, Wei
 
-from eip_4337.constants import ACCOUNT_TYPES
+from eip_4337.constants import ACCOUNT_TYPES, ACCOUNT_TYPES_SET, RECEIPT_POLL_LATENCY
+from eip_4337.multicall import MulticallClient
+
+
+@functools.lru_cache(maxsize=64)
+def _eth_to_wei(amount: int) -> int:
+    """Convert a whole number of ETH to wei."""
+    return amount * 10**18
+
+
+def get_balances(
+    w3: Web3,
+    addresses: List[ChecksumAddress],
+    multicall: Optional[MulticallClient] = None,
+) -> List[int]:
+    """Get the balances of several addresses in a single request.
+
+    The balances are read with one eth_call through Multicall3 when it is
+    deployed, otherwise with a batch request, falling back to one request per
+    address if the provider does not support batch requests.
+
+    Args:
+        w3: Web3 instance to query
+        addresses: Addresses to get the balances of
+        multicall: Multicall3 client to read the balances through
+
+    Returns:
+        Balances in wei, in the same order as the addresses
+    """
+    if not addresses:
+        return []
+
+    if multicall is not None and multicall.is_available():
+        return multicall.eth_balances(addresses)
+
+    try:
+        with w3.batch_requests() as batch:
+            for address in addresses:
+                batch.add(w3.eth.get_balance(address))
+            return cast(List[int], batch.execute())
+    except (Web3TypeError, Web3RPCError):
+        return [w3.eth.get_balance(address) for address in addresses]
+
+
+def get_transaction_receipts(w3: Web3, txn_hashes: List[HexBytes]) -> List[TxReceipt]:
+    """Get the receipts of mined transactions.
+
+    The receipts are fetched in a single batch request, or one request per
+    transaction if the provider does not support batch requests.
+
+    Args:
+        w3: Web3 instance to query
+        txn_hashes: Hashes of the transactions to get receipts for
+
+    Returns:
+        List of transaction receipts, in the same order as the hashes
+    """
+    if not txn_hashes:
+        return []
+
+    try:
+        with w3.batch_requests() as batch:
+            for txn_hash in txn_hashes:
+                batch.add(w3.eth.get_transaction_receipt(txn_hash))
+            return cast(List[TxReceipt], batch.execute())
+    except (Web3TypeError, Web3RPCError):
+        return [w3.eth.get_transaction_receipt(txn_hash) for txn_hash in txn_hashes]
+
+
+def wait_for_transaction_receipts(
+    w3: Web3, txn_hashes: List[HexBytes]
+) -> List[TxReceipt]:
+    """Wait for transactions sent by the same account to be mined.
+
+    Transactions from the same sender are mined in nonce order, so once the last
+    one has a receipt all of the earlier ones have one too. Only the last
+    transaction is polled for, and the other receipts are then fetched together.
+
+    Args:
+        w3: Web3 instance to query
+        txn_hashes: Hashes of the transactions, in nonce order
+
+    Returns:
+        List of transaction receipts, in the same order as the hashes
+    """
+    if not txn_hashes:
+        return []
+
+    last_receipt = w3.eth.wait_for_transaction_receipt(
+        txn_hashes[-1], poll_latency=RECEIPT_POLL_LATENCY
+    )
+    return [*get_transaction_receipts(w3, txn_hashes[:-1]), last_receipt]
+
+
+class _BalanceCache:
+    """Caches account balances for a short time to avoid repeated lookups."""
+
+    def __init__(self, ttl: float = 0.5) -> None:
+        """Initialize the balance cache.
+
+        Args:
+            ttl: Number of seconds a cached balance remains valid
+        """
+        self.ttl = ttl
+        self._data: Dict[str, Tuple[float, int]] = {}
+
+    def get(self, w3: Web3, address: ChecksumAddress) -> int:
+        """Get the balance of an address, fetching it if not cached or expired."""
+        now = time.monotonic()
+        entry = self._data.get(address)
+        if entry is not None and now - entry[0] < self.ttl:
+            return entry[1]
+
+        balance = w3.eth.get_balance(address)
+        self._data[address] = (now, balance)
+        return balance
+
+    def invalidate(self, *addresses: ChecksumAddress) -> None:
+        """Drop the cached balances of the given addresses."""
+        for address in addresses:
+            self._data.pop(address, None)
 
 
 class AccountManager:
@@ -15,21 +139,40 @@ class AccountManager:
     bundler: LocalAccount
     beneficiary: LocalAccount
 
-    def __init__(self, w3: Web3) -> None:
+    _balance_cache = _BalanceCache()
+
+    def __init__(self, w3: Web3, multicall: Optional[MulticallClient] = None) -> None:
         """Initialize the account manager.
 
         Args:
             w3: Web3 instance to use for account interaction
+            multicall: Multicall3 client to read balances through, if deployed
         """
         self.w3 = w3
+        self.multicall = multicall
+        self._default_sender: Optional[ChecksumAddress] = None
+        self._by_address: Dict[ChecksumAddress, LocalAccount] = {}
+        self._by_type: Dict[str, LocalAccount] = {}
+        self._initialized = False
 
-    @staticmethod
-    def initialize_default_account(
-        w3: Web3,
-    ) -> ChecksumAddress:
+    @property
+    def default_sender(self) -> ChecksumAddress:
+        """Address of the node account used to fund the other accounts.
+
+        Fetched once and cached, so funding does not query the node accounts
+        for every transaction.
+        """
+        if self._default_sender is None:
+            self._default_sender = cast(
+                ChecksumAddress, self.w3.eth.default_account or self.w3.eth.accounts[0]
+            )
+        return self._default_sender
+
+    def initialize_default_account(self) -> ChecksumAddress:
         # Set the default account
-        w3.eth.default_account = w3.eth.accounts[0]
-        return w3.eth.default_account
+        self._default_sender = self.w3.eth.accounts[0]
+        self.w3.eth.default_account = self._default_sender
+        return self._default_sender
 
     @staticmethod
     def anvil_set_balance(w3: Web3, address: ChecksumAddress, amount: int) -> None:
@@ -37,10 +180,11 @@ class AccountManager:
         try:
             response = w3.provider.make_request(
                 cast(RPCEndpoint, "anvil_setBalance"),
-                [address, w3.to_hex(w3.to_wei(amount, "ether"))],
+                [address, hex(_eth_to_wei(amount))],
             )
 
             if "result" in response:
+                AccountManager._balance_cache.invalidate(address)
                 return
             elif "error" in response:
                 raise Exception(f"Request error: {response['error']}")
@@ -58,9 +202,9 @@ class AccountManager:
         Returns:
             True if the account has sufficient balance, False otherwise
         """
-        if account and w3.eth.get_balance(account) >= w3.to_wei(amount, "ether"):
-            return True
-        return False
+        if not account:
+            return False
+        return AccountManager._balance_cache.get(w3, account) >= _eth_to_wei(amount)
 
     def check_accounts_initialized(self) -> bool:
         """Check if the accounts are initialized.
@@ -68,26 +212,34 @@ class AccountManager:
         Returns:
             True if the accounts are initialized, False otherwise
         """
-        owner = getattr(self, "owner", None)
-        bundler = getattr(self, "bundler", None)
-        beneficiary = getattr(self, "beneficiary", None)
-        return owner is not None and bundler is not None and beneficiary is not None
+        return self._initialized
 
-    def initialize_accounts(self, amounts: Dict[str, int]) -> None:
-        """Initialize the accounts."""
+    def initialize_accounts(self, amounts_wei: Dict[str, int]) -> None:
+        """Initialize the accounts.
 
-        for account_type in ACCOUNT_TYPES:
-            # Create the account
-            account = self.w3.eth.account.create()
+        Args:
+            amounts_wei: Dictionary mapping account types to amounts of wei to fund
+        """
 
-            # Fund the account
-            try:
-                self.fund_account(account.address, amounts[account_type])
-            except Exception as e:
-                raise e
+        # Create and fund the accounts, waiting for the transfers together
+        new_accounts = {
+            account_type: self.w3.eth.account.create() for account_type in ACCOUNT_TYPES
+        }
+        txn_hashes = self._send_funding_transactions(
+            [
+                self._funding_transaction(account.address, amounts_wei[account_type])
+                for account_type, account in new_accounts.items()
+            ]
+        )
+        self._wait_for_funding(txn_hashes)
 
-            # Update the account in the account manager
+        # Update the accounts in the account manager
+        self._by_address = {}
+        for account_type, account in new_accounts.items():
             setattr(self, account_type, account)
+            self._by_type[account_type] = account
+            self._by_address[account.address] = account
+        self._initialized = True
 
     def get_account_addresses(self) -> Dict[str, ChecksumAddress | None]:
         """Get the addresses of the accounts.
@@ -104,18 +256,36 @@ class AccountManager:
             "beneficiary": beneficiary.address if beneficiary else None,
         }
 
+    def get_all_balances(self) -> Dict[str, int]:
+        """Get the balances of the default and initialized accounts in a single request.
+
+        See get_balances for how the balances are read.
+
+        Returns:
+            Dictionary mapping "default" and the account types to balances in wei,
+            leaving out accounts that are not set
+        """
+        addresses = {
+            account_type: address
+            for account_type, address in {
+                "default": self.w3.eth.default_account,
+                **self.get_account_addresses(),
+            }.items()
+            if address
+        }
+        balances = get_balances(self.w3, list(addresses.values()), self.multicall)
+        return dict(zip(addresses, balances))
+
     def get_account_by_address(self, address: ChecksumAddress) -> LocalAccount:
         """Get an account by address.
 
         Args:
             address: Address to get
         """
-        for account_type in ACCOUNT_TYPES:
-            account = self.get_account_by_type(account_type)
-            if account and account.address == address:
-                return account
-
-        raise ValueError(f"Invalid account address: {address}")
+        try:
+            return self._by_address[address]
+        except KeyError:
+            raise ValueError(f"Invalid account address: {address}")
 
     def get_account_by_type(self, account_type: str) -> LocalAccount | None:
         """Get an account by type.
@@ -123,47 +293,108 @@ class AccountManager:
         Args:
             account_type: Type of account to get
         """
-        if account_type in ACCOUNT_TYPES:
-            return getattr(self, account_type, None)
+        if account_type in ACCOUNT_TYPES_SET:
+            return self._by_type.get(account_type)
         else:
             raise ValueError(f"Invalid account type: {account_type}")
 
-    def fund_account(self, to_addr: ChecksumAddress, amount_eth: int) -> None:
+    def fund_account(
+        self, to_addr: ChecksumAddress, amount_wei: int, wait: bool = True
+    ) -> HexBytes:
         """Fund an account with ETH.
 
         Args:
             to_addr: Address to send to
-            amount_eth: Amount of ETH to send
+            amount_wei: Amount of wei to send
+            wait: Whether to wait for the transaction to be mined
+
+        Returns:
+            Hash of the funding transaction
         """
-        try:
-            txn_hash = self.w3.eth.send_transaction(
-                {
-                    "from": self.w3.eth.accounts[0],
-                    "to": to_addr,
-                    "value": self.w3.to_wei(amount_eth, "ether"),
-                }
-            )
-            txn_receipt = self.w3.eth.wait_for_transaction_receipt(txn_hash)
+        txn_hash = self._send_funding_transactions(
+            [self._funding_transaction(to_addr, amount_wei)]
+        )[0]
+        if wait:
+            self._wait_for_funding([txn_hash])
 
-            if txn_receipt["status"] != 1:
-                raise Exception(f"Transaction failed (status: {txn_receipt['status']})")
-        except Exception as e:
-            raise Exception(
-                f"Failed to fund account: {to_addr}. This is most likely due to the default account not having enough ETH.\nError: {e}"
-            )
+        return txn_hash
 
-    def fund_accounts(self, amounts: Dict[str, int]) -> None:
+    def get_transaction_receipts(self, txn_hashes: List[HexBytes]) -> List[TxReceipt]:
+        """Get the receipts of mined transactions.
+
+        See the module level get_transaction_receipts.
+
+        Args:
+            txn_hashes: Hashes of the transactions to get receipts for
+
+        Returns:
+            List of transaction receipts, in the same order as the hashes
+        """
+        return get_transaction_receipts(self.w3, txn_hashes)
+
+    def fund_accounts(self, amounts_wei: Dict[str, int]) -> None:
         """Fund the accounts.
 
+        All transfers are sent before waiting on any of them, then the receipts
+        are fetched together.
+
         Args:
-            amounts: Dictionary mapping account types to amounts of ETH to fund
+            amounts_wei: Dictionary mapping account types to amounts of wei to fund
         """
-        for account_type, amount in amounts.items():
+        txs = []
+        for account_type, amount_wei in amounts_wei.items():
             account = self.get_account_by_type(account_type)
             if account:
-                try:
-                    self.fund_account(account.address, amount)
-                except Exception as e:
-                    raise e
+                txs.append(self._funding_transaction(account.address, amount_wei))
             else:
                 print(f"Account {account_type} not found")
+
+        self._wait_for_funding(self._send_funding_transactions(txs))
+
+    def _funding_transaction(
+        self, to_addr: ChecksumAddress, amount_wei: int
+    ) -> TxParams:
+        """Build a transfer from the default sender.
+
+        Args:
+            to_addr: Address to send to
+            amount_wei: Amount of wei to send
+        """
+        return {
+            "from": self.default_sender,
+            "to": to_addr,
+            "value": Wei(amount_wei),
+        }
+
+    def _send_funding_transactions(self, txs: List[TxParams]) -> List[HexBytes]:
+        """Send funding transactions without waiting for them to be mined.
+
+        Args:
+            txs: Transactions to send, in nonce order
+
+        Returns:
+            Hashes of the sent transactions, in the order sent
+        """
+        txn_hashes = []
+        for tx in txs:
+            try:
+                txn_hashes.append(self.w3.eth.send_transaction(tx))
+            except Exception as e:
+                raise Exception(
+                    f"Failed to fund account: {tx['to']}. This is most likely due to the default account not having enough ETH.\nError: {e}"
+                )
+            self._balance_cache.invalidate(self.default_sender, tx["to"])
+
+        return txn_hashes
+
+    def _wait_for_funding(self, txn_hashes: List[HexBytes]) -> None:
+        """Wait for funding transactions and check that they succeeded.
+
+        Args:
+            txn_hashes: Hashes of the funding transactions, in the order sent
+        """
+        for txn_receipt in wait_for_transaction_receipts(self.w3, txn_hashes):
+            if txn_receipt["status"] != 1:
+                raise Exception(
+                    f"Failed to fund account: {txn_receipt['to']}.\nError: Transaction failed (status: {txn_receipt['status']})"
+                )
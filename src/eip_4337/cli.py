@@ -1,44 +1,72 @@
-from typing import Dict
+import functools
+import json
+import os
+import sys
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Tuple
 
-from InquirerPy import inquirer
-from InquirerPy.separator import Separator
-from web3 import Web3
-
-from eip_4337.accounts import AccountManager
 from eip_4337.constants import (
     ACCOUNT_TYPES,
     DEFAULT_ETH_AMOUNTS,
+    DEFAULT_ETH_AMOUNTS_WEI,
+    DEFAULT_PROVIDER_URI,
     MINIMUM_DEFAULT_ACCOUNT_BALANCE,
 )
-from eip_4337.contracts import ContractManager, TransactionFailed
-from eip_4337.outputs import (
-    show_account_abstraction_info,
-    show_accounts_info,
-    show_accounts_state,
-    show_beneficiary_info,
-    show_bundler_info,
-    show_chain_state,
-    show_contract_state,
-    show_contracts_info,
-    show_eip_4337_info,
-    show_entry_point_info,
-    show_error_message,
-    show_miner_info,
-    show_node_accounts,
-    show_relayer_info,
-    show_simple_account_info,
-    show_success_message,
-    show_tool_info,
-    show_transaction_logs,
-    show_transaction_receipt,
-    show_user_ops_info,
-    show_warning_message,
-    show_welcome_message,
+
+# InquirerPy, web3 and the modules built on them are slow to import, so they are
+# imported where they are used to keep importing this module cheap.
+if TYPE_CHECKING:
+    from web3 import Web3
+
+    from eip_4337.accounts import AccountManager
+    from eip_4337.contracts import ContractManager
+    from eip_4337.user_ops import AsyncUserOperationManager
+
+MAIN_MENU_CHOICES = (
+    {"name": "Initialize accounts", "value": "Initialize accounts", "key": "a"},
+    {"name": "Initialize contracts", "value": "Initialize contracts", "key": "c"},
+    {"name": "User operation", "value": "User operation", "key": "u"},
+    {"name": "Fund accounts", "value": "Fund accounts", "key": "f"},
+    {"separator": True},
+    {"name": "View status", "value": "View status", "key": "v"},
+    {"name": "Help", "value": "Help", "key": "h"},
+    {"name": "Exit", "value": "Exit", "key": "q"},
 )
-from eip_4337.user_ops import UserOperationManager
 
 
-def _get_amounts() -> Dict[str, int]:
+def _exit_with(value: str) -> Callable[[Any], None]:
+    def _handler(event: Any) -> None:
+        event.app.exit(result=value)
+
+    return _handler
+
+
+MAIN_MENU_KEY_HANDLERS = tuple(
+    (c["key"], _exit_with(c["value"])) for c in MAIN_MENU_CHOICES if "key" in c
+)
+
+
+def _get_amounts(last_amounts: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+    """Prompt for the amounts to fund each account with.
+
+    Args:
+        last_amounts: Amounts in wei used previously this session, offered for reuse
+
+    Returns:
+        Dictionary mapping account types to amounts in wei
+    """
+    from InquirerPy import inquirer
+    from InquirerPy.validator import EmptyInputValidator
+    from web3 import Web3
+
+    if last_amounts is not None:
+        print("\nPrevious amounts:")
+        for account, amt in last_amounts.items():
+            print(f"  {account:<12}: {Web3.from_wei(amt, 'ether')} ETH")
+        print()
+
+        if inquirer.confirm(message="Use previous amounts?", default=True).execute():
+            return last_amounts
+
     print("\nCreating accounts for {}.".format(", ".join(ACCOUNT_TYPES)))
     print("\nAccounts will be pre-funded with default amounts.")
     print("Default amounts:")
@@ -52,21 +80,70 @@ def _get_amounts() -> Dict[str, int]:
     ).execute()
     print()
 
-    if change_defaults:
-        for account in ACCOUNT_TYPES:
-            default_amount = amounts[account]
-            amounts[account] = int(
-                inquirer.text(
-                    message=f"Amount of ETH to fund {account} with:",
-                    default=str(default_amount),
-                ).execute()
-            )
-    return amounts
+    if not change_defaults:
+        return DEFAULT_ETH_AMOUNTS_WEI.copy()
+
+    for account in ACCOUNT_TYPES:
+        amounts[account] = inquirer.number(
+            message=f"Amount of ETH to fund {account} with:",
+            default=amounts[account],
+            min_allowed=0,
+            validate=EmptyInputValidator(),
+            filter=int,
+        ).execute()
+    return {account: Web3.to_wei(amt, "ether") for account, amt in amounts.items()}
+
+
+def _menu_state(
+    accounts: "AccountManager", contracts: "ContractManager"
+) -> Tuple[bool, bool]:
+    return (
+        accounts.check_accounts_initialized(),
+        contracts.check_contracts_initialized(),
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _main_menu_choices(accounts_ready: bool, contracts_ready: bool) -> Tuple[Any, ...]:
+    from InquirerPy.separator import Separator
+
+    disabled = {
+        "Initialize accounts": accounts_ready,
+        "Initialize contracts": not accounts_ready or contracts_ready,
+        "User operation": not accounts_ready or not contracts_ready,
+        "Fund accounts": not accounts_ready,
+    }
+    return tuple(
+        Separator() if c.get("separator") else c["name"]
+        for c in MAIN_MENU_CHOICES
+        if not disabled.get(c.get("value"), False)
+    )
+
+
+def main_menu(accounts: "AccountManager", contracts: "ContractManager") -> str:
+    from InquirerPy import inquirer
+
+    select_prompt = inquirer.select(
+        message="Choose an action:",
+        choices=list(_main_menu_choices(*_menu_state(accounts, contracts))),
+        pointer=">",
+        qmark=">",
+        instruction="(Use arrow keys or hotkeys: c/a/f/u/v/h/q)",
+    )
+    for key, handler in MAIN_MENU_KEY_HANDLERS:
+        select_prompt.register_kb(key)(handler)
+
+    return select_prompt.execute()
 
 
 def check_and_set_default_account_balance(
-    w3: Web3,
+    w3: "Web3",
 ) -> None:
+    from InquirerPy import inquirer
+
+    from eip_4337.accounts import AccountManager
+    from eip_4337.outputs import show_success_message
+
     default_account = w3.eth.default_account
     if default_account and not AccountManager.sufficient_balance(
         w3, default_account, MINIMUM_DEFAULT_ACCOUNT_BALANCE
@@ -91,11 +168,20 @@ def check_and_set_default_account_balance(
 
 
 def execute_user_operation(
-    w3: Web3,
-    accounts: AccountManager,
-    contracts: ContractManager,
-    user_ops: UserOperationManager,
+    w3: "Web3",
+    accounts: "AccountManager",
+    contracts: "ContractManager",
+    user_ops: "AsyncUserOperationManager",
 ) -> None:
+    from InquirerPy import inquirer
+
+    from eip_4337.outputs import (
+        show_success_message,
+        show_transaction_logs,
+        show_transaction_receipt,
+    )
+    from eip_4337.providers import run_async
+
     target = inquirer.text(
         message="Target address:", default=accounts.beneficiary.address
     ).execute()
@@ -103,7 +189,7 @@ def execute_user_operation(
     data = inquirer.text(message="Data (hex, 0x...):", default="0x").execute()
     value_wei = w3.to_wei(value, "ether")
     try:
-        receipt = user_ops.execute_operation(target, value_wei, data)
+        receipt = run_async(user_ops.execute_operation(target, value_wei, data))
         logs = contracts.retrieve_transaction_logs_from_receipt(receipt)
 
         show_success_message("Operation executed!")
@@ -115,12 +201,60 @@ def execute_user_operation(
 
 def start() -> None:
     """Start an interactive EIP-4337 session."""
-    import sys
-
-    w3 = Web3(Web3.HTTPProvider("http://localhost:8545"))
-    accounts = AccountManager(w3)
+    from InquirerPy import inquirer
+    from web3 import AsyncWeb3, Web3
+    from web3.exceptions import Web3RPCError
+
+    from eip_4337.accounts import AccountManager
+    from eip_4337.contracts import (
+        ContractManager,
+        TransactionFailed,
+        start_solc_install,
+    )
+    from eip_4337.outputs import (
+        show_account_abstraction_info,
+        show_accounts_info,
+        show_accounts_state,
+        show_beneficiary_info,
+        show_bundler_info,
+        show_chain_state,
+        show_contract_state,
+        show_contracts_info,
+        show_eip_4337_info,
+        show_entry_point_info,
+        show_error_message,
+        show_miner_info,
+        show_node_accounts,
+        show_relayer_info,
+        show_simple_account_info,
+        show_success_message,
+        show_tool_info,
+        show_transaction_logs,
+        show_user_ops_info,
+        show_warning_message,
+        show_welcome_message,
+    )
+    from eip_4337.providers import (
+        create_async_http_provider,
+        create_http_provider,
+        use_minimal_middleware,
+    )
+    from eip_4337.user_ops import AsyncUserOperationManager
+
+    # Install solc while the user works through the menus
+    start_solc_install()
+
+    w3 = Web3(create_http_provider(DEFAULT_PROVIDER_URI))
+    if os.environ.get("EIP4337_MINIMAL_MIDDLEWARE") == "1":
+        use_minimal_middleware(w3)
+    # Used to make independent requests concurrently
+    async_w3 = AsyncWeb3(create_async_http_provider(DEFAULT_PROVIDER_URI))
     contracts = ContractManager(w3)
-    user_ops = UserOperationManager(w3, accounts, contracts)
+    accounts = AccountManager(w3, contracts.multicall)
+    user_ops = AsyncUserOperationManager(async_w3, accounts, contracts)
+
+    # Funding amounts from the last prompt, reused for the rest of the session
+    last_amounts: Optional[Dict[str, int]] = None
 
     show_welcome_message()
 
@@ -129,69 +263,18 @@ def start() -> None:
 
     print("What would you like to do?")
 
-    def main_menu():
-        menu_choices = [
-            {
-                "name": "Initialize accounts",
-                "value": "Initialize accounts",
-                "key": "a",
-                "disabled": accounts.check_accounts_initialized(),
-            },
-            {
-                "name": "Initialize contracts",
-                "value": "Initialize contracts",
-                "key": "c",
-                "disabled": not accounts.check_accounts_initialized()
-                or contracts.check_contracts_initialized(),
-            },
-            {
-                "name": "User operation",
-                "value": "User operation",
-                "key": "u",
-                "disabled": not accounts.check_accounts_initialized()
-                or not contracts.check_contracts_initialized(),
-            },
-            {
-                "name": "Fund accounts",
-                "value": "Fund accounts",
-                "key": "f",
-                "disabled": not accounts.check_accounts_initialized(),
-            },
-            {"name": Separator()},
-            {"name": "View status", "value": "View status", "key": "v"},
-            {"name": "Help", "value": "Help", "key": "h"},
-            {"name": "Exit", "value": "Exit", "key": "q"},
-        ]
-
-        select_prompt = inquirer.select(
-            message="Choose an action:",
-            choices=[c["name"] for c in menu_choices if not c.get("disabled")],
-            pointer=">",
-            qmark=">",
-            instruction="(Use arrow keys or hotkeys: c/a/f/u/v/h/q)",
-        )
-        for c in menu_choices:
-            key = c.get("key")
-            value = c.get("value")
-            if key:
-
-                @select_prompt.register_kb(key)
-                def _handler(event, value=value):
-                    event.app.exit(result=value)
-
-        return select_prompt.execute()
-
     while True:
-        action = main_menu()
+        action = main_menu(accounts, contracts)
         if action == "Initialize accounts":
             print("\n=== Account Setup ===")
             print("Creating new accounts required for the EIP-4337 flow.\n")
 
-            AccountManager.initialize_default_account(w3)
+            accounts.initialize_default_account()
 
             try:
                 check_and_set_default_account_balance(w3)
-                accounts.initialize_accounts(_get_amounts())
+                last_amounts = _get_amounts(last_amounts)
+                accounts.initialize_accounts(last_amounts)
             except Exception as e:
                 show_error_message(str(e))
                 continue
@@ -201,23 +284,45 @@ def start() -> None:
 
         if action == "Initialize contracts":
             print("\n=== Contract Setup ===")
-            print("This will deploy the EntryPoint and SimpleAccount contracts.\n")
+            try:
+                saved_entry_point = contracts.load_saved_entry_point()
+            except (FileNotFoundError, json.JSONDecodeError, Web3RPCError) as e:
+                show_warning_message(f"Could not check for a saved EntryPoint: {e}")
+                saved_entry_point = None
+            except Exception as e:
+                show_error_message(str(e))
+                continue
+            if saved_entry_point is not None:
+                print(
+                    "This will deploy the SimpleAccount contract, reusing the EntryPoint deployed in an earlier session @ {}.\n".format(
+                        saved_entry_point.address
+                    )
+                )
+                replaced = "Any existing SimpleAccount will be lost."
+            else:
+                print("This will deploy the EntryPoint and SimpleAccount contracts.\n")
+                replaced = "Any existing contracts will be lost."
 
             if inquirer.confirm(
-                message="Are you sure you want to deploy the contracts? Any existing contracts will be lost.",
+                message=f"Are you sure you want to deploy the contracts? {replaced}",
                 default=True,
             ).execute():
                 try:
-                    entry_point = contracts.deploy_entry_point(accounts.owner)
-                    show_success_message(
-                        "EntryPoint deployed successfully @ {}".format(
-                            entry_point.address
-                        )
-                    )
-
-                    simple_account = contracts.deploy_simple_account(
-                        accounts.owner, entry_point.address
+                    entry_point, simple_account, reused = contracts.deploy_all(
+                        accounts.owner, saved_entry_point=saved_entry_point
                     )
+                    if reused:
+                        show_success_message(
+                            "EntryPoint reused from an earlier session @ {}".format(
+                                entry_point.address
+                            )
+                        )
+                    else:
+                        show_success_message(
+                            "EntryPoint deployed successfully @ {}".format(
+                                entry_point.address
+                            )
+                        )
                     show_success_message(
                         "SimpleAccount deployed successfully @ {}".format(
                             simple_account.address
@@ -226,6 +331,12 @@ def start() -> None:
 
                     # Fund the simple account
                     contracts.fund_simple_account(100, accounts.owner)
+
+                    # Multicall3 lets the status views batch their reads
+                    try:
+                        contracts.deploy_multicall()
+                    except Exception as e:
+                        show_warning_message(f"Multicall3 not deployed: {e}")
                 except Exception as e:
                     if isinstance(e, TransactionFailed):
                         logs = contracts.retrieve_transaction_logs_from_receipt(
@@ -269,7 +380,8 @@ def start() -> None:
 
             try:
                 check_and_set_default_account_balance(w3)
-                accounts.fund_accounts(_get_amounts())
+                last_amounts = _get_amounts(last_amounts)
+                accounts.fund_accounts(last_amounts)
             except Exception as e:
                 show_error_message(str(e))
                 continue
@@ -281,41 +393,39 @@ def start() -> None:
             print("\n=== View Status ===")
             print("View the status of the node, accounts and contracts.\n")
 
+            def show_all() -> bool:
+                show_chain_state(w3, async_w3)
+                # Evaluate both so each section is shown before combining the errors
+                has_errors = any(
+                    [
+                        show_contract_state(w3, contracts),
+                        show_accounts_state(w3, accounts),
+                    ]
+                )
+                show_node_accounts(w3, async_w3, contracts.multicall)
+                return has_errors
+
+            status_actions: Dict[str, Callable[[], Optional[bool]]] = {
+                "Show all": show_all,
+                "Chain state": lambda: show_chain_state(w3, async_w3),
+                "Contracts": lambda: show_contract_state(w3, contracts),
+                "Accounts": lambda: show_accounts_state(w3, accounts),
+                "Node accounts": lambda: show_node_accounts(
+                    w3, async_w3, contracts.multicall
+                ),
+            }
+
             while True:
                 status_action = inquirer.select(
                     message="Select an item to view the status:",
-                    choices=[
-                        "Show all",
-                        "Chain state",
-                        "Contracts",
-                        "Accounts",
-                        "Node accounts",
-                        "Return to main menu",
-                    ],
+                    choices=[*status_actions, "Return to main menu"],
                     default="Show all",
                 ).execute()
 
-                has_errors = False
-                if status_action == "Show all":
-                    show_chain_state(w3)
-                    has_errors = show_contract_state(w3, contracts)
-                    has_errors = show_accounts_state(w3, accounts)
-                    show_node_accounts(w3)
-                if status_action == "Chain state":
-                    show_chain_state(w3)
-
-                if status_action == "Contracts":
-                    has_errors = show_contract_state(w3, contracts)
-
-                if status_action == "Accounts":
-                    has_errors = show_accounts_state(w3, accounts)
-
-                if status_action == "Node accounts":
-                    show_node_accounts(w3)
-
                 if status_action == "Return to main menu":
                     break
 
+                has_errors = status_actions[status_action]()
                 if has_errors:
                     print()
                     show_warning_message(
@@ -326,53 +436,32 @@ def start() -> None:
             print("\n=== Help ===")
             print("Find out more about this tool and the EIP-4337 flow.\n")
 
+            help_topics: Dict[str, Callable[[], None]] = {
+                "What is this tool?": show_tool_info,
+                "What is EIP-4337?": show_eip_4337_info,
+                "What is account abstraction?": show_account_abstraction_info,
+                "What accounts are needed?": show_accounts_info,
+                "What contracts are used?": show_contracts_info,
+                "What is a UserOperation?": show_user_ops_info,
+                "What is an EntryPoint?": show_entry_point_info,
+                "What is a SimpleAccount?": show_simple_account_info,
+                "What is a bundler?": show_bundler_info,
+                "What is a beneficiary?": show_beneficiary_info,
+                "What is a relayer?": show_relayer_info,
+                "What is a miner?": show_miner_info,
+            }
+
             while True:
                 help_action = inquirer.select(
                     message="What would you like to learn?",
-                    choices=[
-                        "What is this tool?",
-                        "What is EIP-4337?",
-                        "What is account abstraction?",
-                        "What accounts are needed?",
-                        "What contracts are used?",
-                        "What is a UserOperation?",
-                        "What is an EntryPoint?",
-                        "What is a SimpleAccount?",
-                        "What is a bundler?",
-                        "What is a beneficiary?",
-                        "What is a relayer?",
-                        "What is a miner?",
-                        "Return to main menu",
-                    ],
+                    choices=[*help_topics, "Return to main menu"],
                 ).execute()
 
-                if help_action == "What is this tool?":
-                    show_tool_info()
-                elif help_action == "What is EIP-4337?":
-                    show_eip_4337_info()
-                elif help_action == "What is account abstraction?":
-                    show_account_abstraction_info()
-                elif help_action == "What accounts are needed?":
-                    show_accounts_info()
-                elif help_action == "What contracts are needed?":
-                    show_contracts_info()
-                elif help_action == "What is a UserOperation?":
-                    show_user_ops_info()
-                elif help_action == "What is an EntryPoint?":
-                    show_entry_point_info()
-                elif help_action == "What is a SimpleAccount?":
-                    show_simple_account_info()
-                elif help_action == "What is a bundler?":
-                    show_bundler_info()
-                elif help_action == "What is a beneficiary?":
-                    show_beneficiary_info()
-                elif help_action == "What is a relayer?":
-                    show_relayer_info()
-                elif help_action == "What is a miner?":
-                    show_miner_info()
-                elif help_action == "Return to main menu":
+                if help_action == "Return to main menu":
                     break
 
+                help_topics[help_action]()
+
         elif action == "Exit":
             print("Goodbye!")
             sys.exit(0)
@@ -1,9 +1,22 @@
+DEFAULT_PROVIDER_URI = "http://localhost:8545"
+
+# Canonical Multicall3 address, the same on every chain it is deployed to
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+
 MINIMUM_DEFAULT_ACCOUNT_BALANCE = 10000
 
-ACCOUNT_TYPES = ["owner", "bundler", "beneficiary"]
+ACCOUNT_TYPES = ("owner", "bundler", "beneficiary")
+ACCOUNT_TYPES_SET = frozenset(ACCOUNT_TYPES)
 
 DEFAULT_ETH_AMOUNTS = {
     "owner": 1000,
     "bundler": 100,
     "beneficiary": 0,
 }
+DEFAULT_ETH_AMOUNTS_WEI = {k: v * 10**18 for k, v in DEFAULT_ETH_AMOUNTS.items()}
+
+# Seconds between receipt polls while waiting for a transaction to be mined
+RECEIPT_POLL_LATENCY = 0.05
+
+# Seconds a fetched gas price is reused for, about one block on mainnet
+GAS_PRICE_TTL = 12.0
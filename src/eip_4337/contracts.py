@@ -1,11 +1,215 @@
-from typing import Any, Dict, List, Tuple, Union
-
+import functools
+import hashlib
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import rlp
+import vyper
 from eth_typing import ChecksumAddress, HexStr
-from solcx import compile_files, install_solc
+from eth_utils import keccak, to_canonical_address
+from hexbytes import HexBytes
+from solcx import compile_files, get_installed_solc_versions, install_solc
 from vyper import compile_code
 from web3 import Web3
 from web3.contract import Contract
-from web3.types import TxParams, TxReceipt
+from web3.exceptions import Web3RPCError, Web3TypeError
+from web3.types import (
+    BlockIdentifier,
+    FilterParams,
+    LogReceipt,
+    RPCEndpoint,
+    TxParams,
+    TxReceipt,
+)
+
+from eip_4337.accounts import wait_for_transaction_receipts
+from eip_4337.constants import MULTICALL3_ADDRESS
+from eip_4337.multicall import MulticallClient
+
+# The lowest compiler accepted by every source EntryPoint imports
+SOLC_VERSION = "0.8.28"
+ARTIFACTS_DIR = Path(".build/artifacts")
+DEPLOYMENTS_PATH = Path(".build/deployments.json")
+ENTRY_POINT_SOURCE = "contracts/core/EntryPoint.sol"
+OPENZEPPELIN_REMAPPING = (
+    "@openzeppelin/contracts/",
+    "node_modules/@openzeppelin/contracts/",
+)
+
+_IMPORT_PATTERN = re.compile(
+    r"^\s*import\s+(?:[^\"']*\s+from\s+)?[\"']([^\"']+)[\"']", re.M
+)
+
+
+_solc_install: Optional[threading.Thread] = None
+
+
+def _install_solc_quietly() -> None:
+    """Install solc, leaving any failure to be raised when compiling."""
+    try:
+        _ensure_solc()
+    except Exception:
+        pass
+
+
+def start_solc_install() -> threading.Thread:
+    """Install SOLC_VERSION in a background thread, so it is ready before it is needed.
+
+    Compiling waits for the install to finish. solcx locks installs, so an
+    install started while compiling does not race with this one.
+
+    Returns:
+        The thread running the install
+    """
+    global _solc_install
+    if _solc_install is None:
+        _solc_install = threading.Thread(target=_install_solc_quietly, daemon=True)
+        _solc_install.start()
+    return _solc_install
+
+
+def _ensure_solc() -> None:
+    """Install SOLC_VERSION, unless it is already installed."""
+    if (
+        _solc_install is not None
+        and _solc_install.is_alive()
+        and _solc_install is not threading.current_thread()
+    ):
+        _solc_install.join()
+    if SOLC_VERSION not in {str(v) for v in get_installed_solc_versions()}:
+        install_solc(SOLC_VERSION)
+
+
+def _solidity_sources(path: str) -> List[Path]:
+    """Resolve a Solidity source file and everything it imports.
+
+    Args:
+        path: Path of the source file to resolve
+
+    Returns:
+        Paths of the source file and its imports, in a stable order
+    """
+    prefix, target = OPENZEPPELIN_REMAPPING
+    resolved: Dict[Path, None] = {}
+    pending = [Path(path)]
+    while pending:
+        source = pending.pop()
+        if source in resolved:
+            continue
+        resolved[source] = None
+        for imported in _IMPORT_PATTERN.findall(source.read_text()):
+            if imported.startswith(prefix):
+                pending.append(Path(target + imported[len(prefix) :]))
+            else:
+                pending.append(Path(os.path.normpath(source.parent / imported)))
+
+    return sorted(resolved)
+
+
+def _artifact_digest(sources: List[Path], compiler_version: str) -> str:
+    """Hash the contents of the source files and the compiler version."""
+    digest = hashlib.blake2b(compiler_version.encode(), digest_size=20)
+    for source in sources:
+        digest.update(str(source).encode())
+        digest.update(source.read_bytes())
+    return digest.hexdigest()
+
+
+def _cached_artifact(
+    sources: List[Path],
+    compiler_version: str,
+    compile_artifact: Callable[[], Dict[str, Any]],
+) -> Dict[str, Any]:
+    """Load a compiled artifact from disk, compiling it if it is not cached.
+
+    Artifacts are keyed by the contents of the source files and the compiler
+    version, so editing a contract or changing compiler invalidates the cache.
+
+    Args:
+        sources: Paths of every source file the artifact is compiled from
+        compiler_version: Version of the compiler used
+        compile_artifact: Function that compiles the artifact
+
+    Returns:
+        The compiled artifact
+    """
+    artifact_path = (
+        ARTIFACTS_DIR / f"{_artifact_digest(sources, compiler_version)}.json"
+    )
+
+    try:
+        return json.loads(artifact_path.read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+
+    artifact = compile_artifact()
+    ARTIFACTS_DIR.mkdir(parents=True, exist_ok=True)
+    artifact_path.write_text(json.dumps(artifact))
+    return artifact
+
+
+@functools.lru_cache(maxsize=None)
+def _entry_point_digest() -> str:
+    """Hash the EntryPoint sources once per process, like its compiled artifact."""
+    return _artifact_digest(_solidity_sources(ENTRY_POINT_SOURCE), SOLC_VERSION)
+
+
+@functools.lru_cache(maxsize=None)
+def _compile_entry_point() -> Tuple[Dict[str, Any], str]:
+    source = ENTRY_POINT_SOURCE
+
+    def compile_artifact() -> Dict[str, Any]:
+        _ensure_solc()
+        ep_compiled = compile_files(
+            [source],
+            output_values=["abi", "bin"],
+            solc_version=SOLC_VERSION,
+            base_path=".",
+            import_remappings=[
+                "@openzeppelin/contracts=node_modules/@openzeppelin/contracts/"
+            ],
+        )
+        return ep_compiled[f"{source}:EntryPoint"]
+
+    ep_compiled = _cached_artifact(
+        _solidity_sources(source), SOLC_VERSION, compile_artifact
+    )
+    return ep_compiled["abi"], ep_compiled["bin"]
+
+
+@functools.lru_cache(maxsize=None)
+def _compile_simple_account() -> Tuple[Dict[str, Any], str]:
+    source = Path("contracts/SimpleAccount.vy")
+
+    def compile_artifact() -> Dict[str, Any]:
+        return compile_code(source.read_text(), output_formats=["abi", "bytecode"])
+
+    sa_compiled = _cached_artifact([source], vyper.__version__, compile_artifact)
+    return sa_compiled["abi"], sa_compiled["bytecode"]
+
+
+@functools.lru_cache(maxsize=None)
+def _compile_multicall() -> str:
+    source = "contracts/utils/Multicall3.sol"
+
+    def compile_artifact() -> Dict[str, Any]:
+        _ensure_solc()
+        mc_compiled = compile_files(
+            [source],
+            output_values=["bin-runtime"],
+            solc_version=SOLC_VERSION,
+            base_path=".",
+        )
+        return mc_compiled[f"{source}:Multicall3"]
+
+    mc_compiled = _cached_artifact(
+        _solidity_sources(source), SOLC_VERSION, compile_artifact
+    )
+    return mc_compiled["bin-runtime"]
 
 
 class TransactionFailed(Exception):
@@ -17,8 +221,10 @@ class TransactionFailed(Exception):
 class ContractManager:
     """Manages contract deployment and interaction."""
 
-    entry_point: Contract
-    simple_account: Contract
+    __slots__ = ("w3", "multicall", "entry_point", "simple_account", "_topic_index")
+
+    entry_point: Optional[Contract]
+    simple_account: Optional[Contract]
 
     def __init__(self, w3: Web3) -> None:
         """Initialize the contract manager.
@@ -28,6 +234,10 @@ class ContractManager:
             owner: Web3 account object to use for deployment
         """
         self.w3 = w3
+        self.multicall = MulticallClient(w3)
+        self.entry_point = None
+        self.simple_account = None
+        self._topic_index: Optional[Dict[HexStr, Any]] = None
 
     def check_contracts_initialized(self) -> bool:
         """Check if the contracts are initialized.
@@ -35,124 +245,250 @@ class ContractManager:
         Returns:
             True if the contracts are initialized, False otherwise
         """
-        entry_point = getattr(self, "entry_point", None)
-        simple_account = getattr(self, "simple_account", None)
-        return entry_point is not None and simple_account is not None
+        return self.entry_point is not None and self.simple_account is not None
 
-    def deploy_contract(
+    def _send_deploy(
         self,
         owner: Any,
         abi: Dict[str, Any],
         bytecode: str,
         gas_limit: int,
+        nonce: int,
         *args: Any,
-    ) -> Contract:
-        """Deploy a contract.
+    ) -> HexBytes:
+        """Sign and send a contract deployment without waiting for it to be mined.
 
         Args:
-            contract_name: Name of the contract to compile
+            owner: Account to deploy from
+            abi: ABI of the contract
+            bytecode: Bytecode of the contract
+            gas_limit: Gas limit of the deployment transaction
+            nonce: Nonce of the deployment transaction
             args: Arguments to pass to the contract constructor
 
         Returns:
-            Deployed EntryPoint contract instance
+            Hash of the deployment transaction
         """
-        if not owner:
-            raise ValueError("Owner account must be set for contract deployment.")
-
-        # Build deployment transaction
         tx: TxParams = {
             "from": owner.address,
             "gas": gas_limit,
-            "nonce": self.w3.eth.get_transaction_count(owner.address),
+            "nonce": nonce,
         }
 
-        # Deploy contract
         contract = self.w3.eth.contract(abi=abi, bytecode=bytecode)
         signed_tx = self.w3.eth.account.sign_transaction(
             contract.constructor(*args).build_transaction(tx), owner.key
         )
-        try:
-            tx_hash = self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
-        except Exception as e:
-            raise e
+        return self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+
+    def _deployed_contract(self, receipt: TxReceipt, abi: Dict[str, Any]) -> Contract:
+        """Get the contract created by a mined deployment.
+
+        Args:
+            receipt: Receipt of the deployment transaction
+            abi: ABI of the contract
 
+        Returns:
+            Deployed contract instance
+        """
         if receipt["status"] != 1 or receipt["contractAddress"] is None:
             raise Exception(f"Contract deployment failed: {receipt}")
 
-        # Store contract instance
         return self.w3.eth.contract(address=receipt["contractAddress"], abi=abi)
 
-    def compile_entry_point(self) -> Tuple[Dict[str, Any], str]:
-        """Compile the EntryPoint contract.
+    def deploy_all(
+        self, owner: Any, saved_entry_point: Optional[Contract] = None
+    ) -> Tuple[Contract, Contract, bool]:
+        """Deploy the EntryPoint and SimpleAccount contracts together.
+
+        The EntryPoint address is derived from the owner's nonce, so both
+        deployments can be sent back to back and mined in the same block. If an
+        EntryPoint from an earlier session is given, it is reused and only the
+        SimpleAccount is deployed.
+
+        Args:
+            owner: Account to deploy from
+            saved_entry_point: EntryPoint returned by load_saved_entry_point
 
         Returns:
-            Tuple containing the ABI and bytecode of the compiled EntryPoint contract
+            Tuple containing the EntryPoint and SimpleAccount contracts, and
+            whether the EntryPoint was reused from an earlier session
         """
-        install_solc("0.8.20")
-        ep_compiled = compile_files(
-            [
-                "contracts/core/EntryPoint.sol",
-            ],
-            output_values=["abi", "bin"],
-            base_path=".",
-            import_remappings=[
-                "@openzeppelin/contracts=node_modules/@openzeppelin/contracts/"
-            ],
+        if not owner:
+            raise ValueError("Owner account must be set for contract deployment.")
+
+        sa_abi, sa_bytecode = self.compile_simple_account()
+        entry_point = saved_entry_point
+        reused = entry_point is not None
+
+        nonce = self.w3.eth.get_transaction_count(owner.address, "pending")
+        if entry_point is None:
+            ep_abi, ep_bytecode = self.compile_entry_point()
+            entry_point_address = Web3.to_checksum_address(
+                keccak(rlp.encode([to_canonical_address(owner.address), nonce]))[12:]
+            )
+            ep_hash = self._send_deploy(owner, ep_abi, ep_bytecode, 10_000_000, nonce)
+            nonce += 1
+        else:
+            entry_point_address = entry_point.address
+
+        sa_hash = self._send_deploy(
+            owner,
+            sa_abi,
+            sa_bytecode,
+            5_000_000,
+            nonce,
+            owner.address,
+            entry_point_address,
         )
-        ep_abi = ep_compiled["contracts/core/EntryPoint.sol:EntryPoint"]["abi"]
-        ep_bytecode = ep_compiled["contracts/core/EntryPoint.sol:EntryPoint"]["bin"]
 
-        return ep_abi, ep_bytecode
+        if entry_point is None:
+            ep_receipt, sa_receipt = wait_for_transaction_receipts(
+                self.w3, [ep_hash, sa_hash]
+            )
+            entry_point = self._deployed_contract(ep_receipt, ep_abi)
+            self._save_entry_point(entry_point.address)
+        else:
+            (sa_receipt,) = wait_for_transaction_receipts(self.w3, [sa_hash])
+        simple_account = self._deployed_contract(sa_receipt, sa_abi)
+
+        self.entry_point = entry_point
+        self.simple_account = simple_account
+        self._topic_index = None
+        return entry_point, simple_account, reused
+
+    def _deployment_key(self) -> str:
+        """Key identifying the EntryPoint build deployed on the connected chain."""
+        return f"{self.w3.eth.chain_id}:{_entry_point_digest()}"
+
+    def load_saved_entry_point(self) -> Optional[Contract]:
+        """Attach to an EntryPoint deployed in an earlier session.
 
-    def deploy_entry_point(self, owner: Any) -> Contract:
-        """Deploy the EntryPoint contract.
+        The EntryPoint has no constructor arguments, so one deployed from the
+        same sources can be shared by every session on the same chain. It is only
+        reused if its code is still on chain, since restarting the node wipes it.
 
         Returns:
-            Deployed EntryPoint contract instance
+            The saved EntryPoint contract, or None if there is none to reuse
         """
-        # Compile contract
-        abi, bytecode = self.compile_entry_point()
         try:
-            self.entry_point = self.deploy_contract(owner, abi, bytecode, 10_000_000)
-        except Exception as e:
-            raise e
+            deployments = json.loads(DEPLOYMENTS_PATH.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
 
-        return self.entry_point
+        address = deployments.get(self._deployment_key())
+        if address is None or not self.w3.eth.get_code(address):
+            return None
+
+        abi, _ = self.compile_entry_point()
+        return self.w3.eth.contract(address=address, abi=abi)
+
+    def _save_entry_point(self, address: ChecksumAddress) -> None:
+        """Save the address of a deployed EntryPoint for later sessions."""
+        try:
+            deployments = json.loads(DEPLOYMENTS_PATH.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            deployments = {}
+
+        deployments[self._deployment_key()] = address
+        DEPLOYMENTS_PATH.parent.mkdir(parents=True, exist_ok=True)
+        DEPLOYMENTS_PATH.write_text(json.dumps(deployments))
+
+    def compile_entry_point(self) -> Tuple[Dict[str, Any], str]:
+        """Compile the EntryPoint contract.
+
+        Returns:
+            Tuple containing the ABI and bytecode of the compiled EntryPoint contract
+
+        The compiled contract is cached in the artifacts directory, so it is only
+        recompiled when a source file or the compiler version changes.
+        """
+        return _compile_entry_point()
 
     def compile_simple_account(self) -> Tuple[Dict[str, Any], str]:
         """Compile the SimpleAccount contract.
 
         Returns:
             Tuple containing the ABI and bytecode of the compiled SimpleAccount contract
+
+        The compiled contract is cached in the artifacts directory, so it is only
+        recompiled when the source file or the compiler version changes.
         """
-        with open("contracts/SimpleAccount.vy", "r") as f:
-            sa_source = f.read()
-        sa_compiled = compile_code(sa_source, output_formats=["abi", "bytecode"])
-        sa_abi = sa_compiled["abi"]
-        sa_bytecode = sa_compiled["bytecode"]
+        return _compile_simple_account()
 
-        return sa_abi, sa_bytecode
+    def compile_multicall(self) -> str:
+        """Compile the Multicall3 contract.
 
-    def deploy_simple_account(self, owner: Any, entry_point_address: str) -> Contract:
-        """Deploy the SimpleAccount contract.
+        Returns:
+            Runtime bytecode of the compiled Multicall3 contract
+        """
+        return _compile_multicall()
 
-        Args:
-            entry_point_address: Address of the EntryPoint contract
+    def deploy_multicall(self) -> None:
+        """Deploy the Multicall3 contract at its canonical address.
+
+        Uses anvil_setCode, so this only works against an Anvil node. Does nothing
+        if the contract is already deployed.
+        """
+        if self.multicall.is_available(refresh=True):
+            return
+
+        runtime_bytecode = self.compile_multicall()
+        response = self.w3.provider.make_request(
+            RPCEndpoint("anvil_setCode"),
+            [MULTICALL3_ADDRESS, f"0x{runtime_bytecode}"],
+        )
+        if "error" in response:
+            raise Exception(f"Failed to deploy Multicall3: {response['error']}")
+        self.multicall.is_available(refresh=True)
+
+    def get_contract_balances(self) -> Dict[str, int]:
+        """Get the balances of the deployed contracts.
+
+        The reads are aggregated into a single eth_call through Multicall3 when it
+        is deployed, otherwise they are made in a single batch request.
 
         Returns:
-            Deployed SimpleAccount contract instance
+            Dictionary with the EntryPoint and SimpleAccount ETH balances and the
+            SimpleAccount deposit held by the EntryPoint, in wei
         """
-        # Compile contract
-        abi, bytecode = self.compile_simple_account()
-        try:
-            self.simple_account = self.deploy_contract(
-                owner, abi, bytecode, 5_000_000, owner.address, entry_point_address
+        entry_point = self.entry_point
+        simple_account = self.simple_account
+
+        if self.multicall.is_available():
+            ep_balance, sa_balance, sa_deposit = self.multicall.aggregate3_uint256(
+                [
+                    self.multicall.eth_balance_call(entry_point.address),
+                    self.multicall.eth_balance_call(simple_account.address),
+                    (
+                        entry_point.address,
+                        False,
+                        HexBytes(
+                            entry_point.encode_abi(
+                                "balanceOf", args=[simple_account.address]
+                            )
+                        ),
+                    ),
+                ]
             )
-        except Exception as e:
-            raise e
+        else:
+            get_deposit = entry_point.functions.balanceOf(simple_account.address)
+            try:
+                with self.w3.batch_requests() as batch:
+                    batch.add(self.w3.eth.get_balance(entry_point.address))
+                    batch.add(self.w3.eth.get_balance(simple_account.address))
+                    batch.add(get_deposit)
+                    ep_balance, sa_balance, sa_deposit = batch.execute()
+            except (Web3TypeError, Web3RPCError):
+                ep_balance = self.w3.eth.get_balance(entry_point.address)
+                sa_balance = self.w3.eth.get_balance(simple_account.address)
+                sa_deposit = get_deposit.call()
 
-        return self.simple_account
+        return {
+            "EntryPoint": ep_balance,
+            "SimpleAccount": sa_balance,
+            "SimpleAccountDeposit": sa_deposit,
+        }
 
     def get_contract_addresses(self) -> Dict[str, Union[ChecksumAddress, None]]:
         """Get addresses of deployed contracts.
@@ -160,8 +496,8 @@ class ContractManager:
         Returns:
             Dictionary mapping contract names to addresses
         """
-        entry_point = getattr(self, "entry_point", None)
-        simple_account = getattr(self, "simple_account", None)
+        entry_point = self.entry_point
+        simple_account = self.simple_account
         return {
             "EntryPoint": self.w3.to_checksum_address(entry_point.address)
             if entry_point
@@ -195,16 +531,95 @@ class ContractManager:
             raise e
 
     def retrieve_transaction_logs_from_txn_hash(
-        self, txn_hash: HexStr
+        self, txn_hash: HexStr, block_hash: Optional[HexBytes] = None
     ) -> List[Dict[str, Any]]:
         """Retrieve and process logs from a transaction hash.
 
+        Given the hash of the transaction's block, only the EntryPoint and
+        SimpleAccount logs are fetched, falling back to the full transaction
+        receipt if the node cannot filter them.
+
         Args:
             txn_hash: Transaction hash to retrieve logs from
+            block_hash: Hash of the block the transaction was mined in, if known
         """
+        if block_hash is not None:
+            try:
+                return self.get_filtered_logs(txn_hash, block_hash)
+            except Web3RPCError:
+                pass
         txn_receipt = self.w3.eth.get_transaction_receipt(txn_hash)
         return self.retrieve_transaction_logs_from_receipt(txn_receipt)
 
+    def get_filtered_logs(
+        self, txn_hash: HexStr, block_hash: HexBytes
+    ) -> List[Dict[str, Any]]:
+        """Retrieve and process the contract logs emitted by a transaction.
+
+        The node filters the logs of the transaction's block by contract address
+        and event topic, so unrelated logs are never transferred or decoded.
+
+        Args:
+            txn_hash: Hash of a mined transaction
+            block_hash: Hash of the block the transaction was mined in
+
+        Returns:
+            Processed EntryPoint and SimpleAccount logs of the transaction
+        """
+        logs_by_txn = self._get_contract_logs({"blockHash": block_hash})
+        return self._process_logs(logs_by_txn.get(HexBytes(txn_hash), []))
+
+    def retrieve_logs_for_block_range(
+        self, from_block: BlockIdentifier, to_block: BlockIdentifier
+    ) -> Dict[HexStr, List[Dict[str, Any]]]:
+        """Retrieve and process the contract logs emitted in a range of blocks.
+
+        All of the logs are fetched with a single eth_getLogs call, so showing the
+        logs of several transactions does not need a receipt for each one.
+
+        Args:
+            from_block: First block of the range
+            to_block: Last block of the range
+
+        Returns:
+            Dictionary mapping transaction hashes to their processed EntryPoint
+            and SimpleAccount logs
+        """
+        logs_by_txn = self._get_contract_logs(
+            {"fromBlock": from_block, "toBlock": to_block}
+        )
+        return {
+            txn_hash.to_0x_hex(): self._process_logs(logs)
+            for txn_hash, logs in logs_by_txn.items()
+        }
+
+    def _get_contract_logs(
+        self, block_filter: FilterParams
+    ) -> Dict[HexBytes, List[LogReceipt]]:
+        """Fetch the EntryPoint and SimpleAccount logs, grouped by transaction.
+
+        The node filters the logs by contract address and event topic.
+
+        Args:
+            block_filter: Block range or block hash to fetch the logs of
+
+        Returns:
+            Dictionary mapping transaction hashes to their logs, in log order
+        """
+        logs = self.w3.eth.get_logs(
+            {
+                **block_filter,
+                "address": [self.entry_point.address, self.simple_account.address],
+                # A list in the first position matches any of its topics
+                "topics": [list(self._get_topic_index())],
+            }
+        )
+
+        logs_by_txn: Dict[HexBytes, List[LogReceipt]] = {}
+        for log in logs:
+            logs_by_txn.setdefault(HexBytes(log["transactionHash"]), []).append(log)
+        return logs_by_txn
+
     def retrieve_transaction_logs_from_receipt(
         self, txn_receipt: TxReceipt
     ) -> List[Dict[str, Any]]:
@@ -216,44 +631,56 @@ class ContractManager:
         if len(txn_receipt["logs"]) == 0:
             return []
 
-        # Process the logs
+        return self._process_logs(txn_receipt["logs"])
+
+    def _process_logs(self, logs: List[LogReceipt]) -> List[Dict[str, Any]]:
+        """Decode logs emitted by the EntryPoint and SimpleAccount contracts.
+
+        Args:
+            logs: Logs to decode; logs of unknown events are skipped
+        """
+        topic_index = self._get_topic_index()
+        sources = {
+            self.simple_account.address: "SimpleAccount",
+            self.entry_point.address: "EntryPoint",
+        }
         transaction_logs = []
-        try:
-            for log in txn_receipt["logs"]:
-                log_topic = Web3.to_hex(log["topics"][0])
-
-                sa_events = self.simple_account.all_events()
-                sa_topics = [event.topic for event in sa_events]
-                sa_events_and_topics = zip(sa_events, sa_topics)
-
-                ep_events = self.entry_point.all_events()
-                ep_topics = [event.topic for event in ep_events]
-                ep_events_and_topics = zip(ep_events, ep_topics)
-
-                for event, topic in [*sa_events_and_topics, *ep_events_and_topics]:
-                    if topic == log_topic:
-                        processed_log = event.process_log(log)
-                        contract_address = processed_log.address
-
-                        if contract_address == self.simple_account.address:
-                            log_source = "SimpleAddress"
-                        elif contract_address == self.entry_point.address:
-                            log_source = "EntryPoint"
-                        else:
-                            log_source = "Unknown"
-
-                        transaction_logs.append(
-                            {
-                                "source": log_source,
-                                "event": processed_log.event,
-                                "args": processed_log.args,
-                            }
-                        )
-        except Exception as e:
-            raise e
+        for log in logs:
+            event = topic_index.get(Web3.to_hex(log["topics"][0]))
+            if event is None:
+                continue
+
+            processed_log = event.process_log(log)
+            log_source = sources.get(processed_log["address"], "Unknown")
+
+            transaction_logs.append(
+                {
+                    "source": log_source,
+                    "event": processed_log["event"],
+                    "args": processed_log["args"],
+                }
+            )
 
         return transaction_logs
 
+    def _get_topic_index(self) -> Dict[HexStr, Any]:
+        """Get the topic index, building it after the contracts are deployed."""
+        if self._topic_index is None:
+            self._topic_index = self._build_topic_index()
+        return self._topic_index
+
+    def _build_topic_index(self) -> Dict[HexStr, Any]:
+        """Map the event topics of the deployed contracts to their events.
+
+        Returns:
+            Dictionary mapping event topics to events
+        """
+        return {
+            event.topic: event
+            for contract in (self.entry_point, self.simple_account)
+            for event in contract.all_events()
+        }
+
     def fund_simple_account(self, amount_eth: float, owner: Any) -> None:
         """Fund the simple account through the entry point.
 
@@ -263,48 +690,54 @@ class ContractManager:
         """
         entry_point = self.entry_point
         simple_account = self.simple_account
+        amount_wei = self.w3.to_wei(amount_eth, "ether")
+
+        # Both transactions come from the owner, so send them with consecutive
+        # nonces and wait for them together
+        nonce = self.w3.eth.get_transaction_count(owner.address, "pending")
 
         # Deposit ETH to the simple account to send value with a user operation
         try:
             tx = {
                 "from": owner.address,
                 "to": simple_account.address,
-                "value": self.w3.to_wei(amount_eth, "ether"),
+                "value": amount_wei,
                 "gas": 100_000,
                 "gasPrice": self.w3.eth.gas_price,
-                "nonce": self.w3.eth.get_transaction_count(owner.address),
+                "nonce": nonce,
             }
             signed_tx = self.w3.eth.account.sign_transaction(tx, owner.key)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-            txn_receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
-
-            if txn_receipt["status"] != 1:
-                raise TransactionFailed("Transaction failed", txn_receipt)
+            transfer_hash = self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
         except Exception as e:
-            if isinstance(e, TransactionFailed):
-                raise
             raise Exception(f"Error funding SimpleAccount: {e}")
 
         # Deposit ETH to the entry point to cover gas fees for SimpleAccount
-        tx = entry_point.functions.depositTo(
-            simple_account.address,
-        ).build_transaction(
-            {
-                "from": owner.address,
-                "value": self.w3.to_wei(amount_eth, "ether"),
-                "gas": 100_000,
-                "nonce": self.w3.eth.get_transaction_count(owner.address),
-            }
-        )
-
         try:
+            tx = entry_point.functions.depositTo(
+                simple_account.address,
+            ).build_transaction(
+                {
+                    "from": owner.address,
+                    "value": amount_wei,
+                    "gas": 100_000,
+                    "nonce": nonce + 1,
+                }
+            )
             signed_tx = self.w3.eth.account.sign_transaction(tx, owner.key)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-            self.w3.eth.wait_for_transaction_receipt(tx_hash)
+            deposit_hash = self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
         except Exception as e:
             print(
                 f"Error funding EntryPoint to pay for gas on behalf of SimpleAccount: {e}"
             )
             raise e
 
+        transfer_receipt, deposit_receipt = wait_for_transaction_receipts(
+            self.w3, [transfer_hash, deposit_hash]
+        )
+
+        if transfer_receipt["status"] != 1:
+            raise TransactionFailed("Transaction failed", transfer_receipt)
+        if deposit_receipt["status"] != 1:
+            raise TransactionFailed("Transaction failed", deposit_receipt)
+
         print(f"Initialized SimpleAccount with {amount_eth} ETH")
@@ -0,0 +1,104 @@
+from typing import List, Optional, Tuple
+
+from eth_abi import decode, encode
+from eth_utils import function_signature_to_4byte_selector
+from web3 import Web3
+
+from eip_4337.constants import MULTICALL3_ADDRESS
+
+# (target, allowFailure, callData)
+Call3 = Tuple[str, bool, bytes]
+
+AGGREGATE3_SELECTOR = function_signature_to_4byte_selector(
+    "aggregate3((address,bool,bytes)[])"
+)
+GET_ETH_BALANCE_SELECTOR = function_signature_to_4byte_selector(
+    "getEthBalance(address)"
+)
+
+
+class MulticallClient:
+    """Aggregates read-only contract calls into a single eth_call via Multicall3."""
+
+    def __init__(self, w3: Web3, address: str = MULTICALL3_ADDRESS) -> None:
+        """Initialize the multicall client.
+
+        Args:
+            w3: Web3 instance to use for calls
+            address: Address of the Multicall3 contract
+        """
+        self.w3 = w3
+        self.address = address
+        self._available: Optional[bool] = None
+
+    def is_available(self, refresh: bool = False) -> bool:
+        """Check if Multicall3 is deployed at the client address.
+
+        The result is cached, so only the first check makes a request.
+
+        Args:
+            refresh: Whether to check again instead of using the cached result
+
+        Returns:
+            True if the address has code, False otherwise
+        """
+        if self._available is None or refresh:
+            self._available = len(self.w3.eth.get_code(self.address)) > 0
+        return self._available
+
+    def eth_balances(self, addresses: List[str]) -> List[int]:
+        """Get the ETH balances of several addresses in a single eth_call.
+
+        Args:
+            addresses: Addresses to get the balances of
+
+        Returns:
+            Balances in wei, in the same order as the addresses
+        """
+        return self.aggregate3_uint256(
+            [self.eth_balance_call(address) for address in addresses]
+        )
+
+    def eth_balance_call(self, address: str) -> Call3:
+        """Build a call that reads the ETH balance of an address.
+
+        Args:
+            address: Address to get the balance of
+        """
+        return (
+            self.address,
+            False,
+            GET_ETH_BALANCE_SELECTOR + encode(["address"], [address]),
+        )
+
+    def aggregate3(self, calls: List[Call3]) -> List[Tuple[bool, bytes]]:
+        """Make several calls in a single eth_call.
+
+        Args:
+            calls: Calls to make, as (target, allowFailure, callData) tuples
+
+        Returns:
+            List of (success, returnData) tuples, in the same order as the calls
+        """
+        result = self.w3.eth.call(
+            {
+                "to": self.address,
+                "data": AGGREGATE3_SELECTOR
+                + encode(["(address,bool,bytes)[]"], [calls]),
+            }
+        )
+        return list(decode(["(bool,bytes)[]"], result)[0])
+
+    def aggregate3_uint256(self, calls: List[Call3]) -> List[int]:
+        """Make several calls that each return a uint256 in a single eth_call.
+
+        Args:
+            calls: Calls to make, none of which may fail
+
+        Returns:
+            List of decoded return values, in the same order as the calls
+        """
+        return [
+            decode(["uint256"], return_data)[0]
+            for _, return_data in self.aggregate3(calls)
+        ]
@@ -0,0 +1,117 @@
+import asyncio
+import atexit
+from typing import Any, Coroutine, Optional, TypeVar
+
+import requests
+from aiohttp import ClientSession, TCPConnector
+from requests.adapters import HTTPAdapter
+from web3 import AsyncHTTPProvider, HTTPProvider, Web3
+from web3.types import RPCEndpoint
+
+T = TypeVar("T")
+
+# Requests whose results do not change for the lifetime of a node. Responses are
+# cached per provider and never invalidated, so restart the tool after switching
+# chains or restarting the node.
+IMMUTABLE_REQUESTS = {
+    RPCEndpoint("eth_chainId"),
+    RPCEndpoint("eth_accounts"),
+    RPCEndpoint("net_version"),
+    RPCEndpoint("web3_clientVersion"),
+}
+
+# Sized so concurrent requests never wait for a free connection
+POOL_SIZE = 32
+
+_runner: Optional[asyncio.Runner] = None
+
+
+def run_async(coro: Coroutine[Any, Any, T]) -> T:
+    """Run a coroutine on the event loop shared by the async providers.
+
+    The loop lives for the rest of the process, so the pooled connections of
+    async providers can be reused from one call to the next.
+
+    Args:
+        coro: Coroutine to run
+
+    Returns:
+        Result of the coroutine
+    """
+    global _runner
+    if _runner is None:
+        _runner = asyncio.Runner()
+        atexit.register(_runner.close)
+    return _runner.run(coro)
+
+
+def create_http_provider(endpoint_uri: str) -> HTTPProvider:
+    """Create an HTTP provider that reuses pooled keep-alive connections.
+
+    Args:
+        endpoint_uri: URI of the JSON-RPC endpoint
+
+    Returns:
+        HTTP provider with a shared session and request caching enabled
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=0
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"Connection": "keep-alive"})
+
+    provider = HTTPProvider(
+        endpoint_uri, session=session, request_kwargs={"timeout": 5}
+    )
+    provider.cache_allowed_requests = True
+    provider.cacheable_requests = {*provider.cacheable_requests, *IMMUTABLE_REQUESTS}
+
+    return provider
+
+
+def create_async_http_provider(endpoint_uri: str) -> AsyncHTTPProvider:
+    """Create an async HTTP provider for making independent requests concurrently.
+
+    The provider's session keeps its connections alive, unlike web3.py's default
+    async session which closes each connection after a request. The session is
+    bound to the shared event loop, so run the provider's requests with
+    run_async.
+
+    Args:
+        endpoint_uri: URI of the JSON-RPC endpoint
+
+    Returns:
+        Async HTTP provider with a pooled session and request caching enabled
+    """
+    provider = AsyncHTTPProvider(endpoint_uri, request_kwargs={"timeout": 5})
+    provider.cache_allowed_requests = True
+    provider.cacheable_requests = {*provider.cacheable_requests, *IMMUTABLE_REQUESTS}
+
+    async def create_session() -> ClientSession:
+        return ClientSession(
+            raise_for_status=True,
+            connector=TCPConnector(limit=POOL_SIZE, keepalive_timeout=60),
+        )
+
+    session = run_async(create_session())
+    run_async(provider.cache_async_session(session))
+    # Registered after the runner, so the session is closed before the loop
+    atexit.register(lambda: run_async(session.close()))
+
+    return provider
+
+
+def use_minimal_middleware(w3: Web3) -> None:
+    """Remove web3.py's default middleware to cut per-request overhead.
+
+    Intended for a local Anvil node, which estimates gas for transactions sent
+    without a gas limit. Results are returned as plain dictionaries instead of
+    AttributeDicts, and ENS names and transaction fields are no longer
+    validated before sending.
+
+    Args:
+        w3: Web3 instance to configure
+    """
+    w3.middleware_onion.clear()
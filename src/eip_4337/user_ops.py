@@ -1,28 +1,480 @@
-from typing import Dict, Tuple
-
-from web3 import Web3
+import asyncio
+import functools
+import struct
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from eth_abi import encode
+from eth_typing import HexStr
+from eth_utils import function_signature_to_4byte_selector, keccak
+from hexbytes import HexBytes
+from web3 import AsyncWeb3, Web3
+from web3.contract import AsyncContract
+from web3.exceptions import (
+    TimeExhausted,
+    TransactionNotFound,
+    Web3Exception,
+    Web3RPCError,
+    Web3TypeError,
+)
+from web3.providers.persistent import PersistentConnectionProvider
 from web3.types import TxReceipt
 
 from eip_4337.accounts import AccountManager
+from eip_4337.constants import GAS_PRICE_TTL, RECEIPT_POLL_LATENCY
 from eip_4337.contracts import ContractManager
 
+# The EntryPoint hashes user operations as EIP-712 typed data in this domain
+ENTRY_POINT_DOMAIN_NAME = "ERC4337"
+ENTRY_POINT_DOMAIN_VERSION = "1"
+
+_EIP712_DOMAIN_TYPEHASH = keccak(
+    text="EIP712Domain(string name,string version,uint256 chainId,address verifyingContract)"
+)
+_PACKED_USEROP_TYPEHASH = keccak(
+    text="PackedUserOperation(address sender,uint256 nonce,bytes initCode,bytes callData,bytes32 accountGasLimits,uint256 preVerificationGas,bytes32 gasFees,bytes paymasterAndData)"
+)
+
+
+# Selector of SimpleAccount.execute(address,uint256,bytes)
+EXECUTE_SELECTOR = function_signature_to_4byte_selector(
+    "execute(address,uint256,bytes)"
+)
+
+
+def _encode_execute(target: str, value: int, data: str) -> bytes:
+    """Encode a SimpleAccount execute call without going through the contract ABI.
+
+    Args:
+        target: Target address for the call
+        value: Value to send with the call (in Wei)
+        data: Hex encoded data to send with the call
+
+    Returns:
+        Encoded call data
+    """
+    return EXECUTE_SELECTOR + encode(
+        ["address", "uint256", "bytes"], [target, value, HexBytes(data)]
+    )
+
+
+_UINT64_MASK = (1 << 64) - 1
+
+
+def _pack_uint128_pair(high: int, low: int) -> bytes:
+    """Pack two uint128 values into a bytes32, as the EntryPoint unpacks them.
+
+    Args:
+        high: Value stored in the upper 128 bits
+        low: Value stored in the lower 128 bits
+
+    Returns:
+        The packed 32 bytes
+    """
+    if not (0 <= high < 1 << 128 and 0 <= low < 1 << 128):
+        raise ValueError(f"Values must fit in uint128: {high}, {low}")
+
+    return struct.pack(
+        ">QQQQ", high >> 64, high & _UINT64_MASK, low >> 64, low & _UINT64_MASK
+    )
+
+
+@functools.lru_cache(maxsize=8)
+def _domain_separator(entry_point_address: str, chain_id: int) -> bytes:
+    """Compute the EIP-712 domain separator of an EntryPoint."""
+    return keccak(
+        encode(
+            ["bytes32", "bytes32", "bytes32", "uint256", "address"],
+            [
+                _EIP712_DOMAIN_TYPEHASH,
+                keccak(text=ENTRY_POINT_DOMAIN_NAME),
+                keccak(text=ENTRY_POINT_DOMAIN_VERSION),
+                chain_id,
+                entry_point_address,
+            ],
+        )
+    )
+
+
+def _user_op_hash(
+    packed_user_op: Tuple, entry_point_address: str, chain_id: int
+) -> bytes:
+    """Compute the hash of a packed user operation, as EntryPoint.getUserOpHash does.
+
+    Args:
+        packed_user_op: Packed operation, with or without a signature
+        entry_point_address: Address of the EntryPoint
+        chain_id: ID of the chain the EntryPoint is deployed on
+
+    Returns:
+        User operation hash to sign
+    """
+    (
+        sender,
+        nonce,
+        init_code,
+        call_data,
+        account_gas_limits,
+        pre_verification_gas,
+        gas_fees,
+        paymaster_and_data,
+    ) = packed_user_op[:8]
+    struct_hash = keccak(
+        encode(
+            [
+                "bytes32",
+                "address",
+                "uint256",
+                "bytes32",
+                "bytes32",
+                "bytes32",
+                "uint256",
+                "bytes32",
+                "bytes32",
+            ],
+            [
+                _PACKED_USEROP_TYPEHASH,
+                sender,
+                nonce,
+                keccak(init_code),
+                keccak(call_data),
+                account_gas_limits,
+                pre_verification_gas,
+                gas_fees,
+                keccak(paymaster_and_data),
+            ],
+        )
+    )
+    return keccak(
+        b"\x19\x01" + _domain_separator(entry_point_address, chain_id) + struct_hash
+    )
+
+
+def _assemble_operation(
+    call_data: bytes, nonce: int, sender: str
+) -> Tuple[Dict, bytes, bytes]:
+    """Assemble a user operation from its encoded call and nonce.
+
+    Args:
+        call_data: Encoded SimpleAccount call
+        nonce: EntryPoint nonce of the SimpleAccount
+        sender: Address of the SimpleAccount
+
+    Returns:
+        Tuple of (user operation dict, gas limits bytes, gas fees bytes)
+    """
+    # Build the operation
+    user_op = {
+        "sender": sender,
+        "nonce": nonce,
+        # Byte fields are decoded once here so packing only assembles a tuple
+        "initCode": b"",
+        "callData": call_data,
+        "callGasLimit": 1_000_000,
+        "verificationGasLimit": 1_000_000,
+        "preVerificationGas": 1_000_000,
+        "maxFeePerGas": Web3.to_wei(2, "gwei"),
+        "maxPriorityFeePerGas": Web3.to_wei(1, "gwei"),
+        "paymasterAndData": b"",
+        "signature": b"",
+    }
+
+    # Pack gas limits and fees
+    vgas = user_op["verificationGasLimit"]
+    cgas = user_op["callGasLimit"]
+    maxPr = user_op["maxPriorityFeePerGas"]
+    maxF = user_op["maxFeePerGas"]
+
+    account_gas_limits_bytes = _pack_uint128_pair(vgas, cgas)
+    gas_fees_bytes = _pack_uint128_pair(maxPr, maxF)
+
+    return user_op, account_gas_limits_bytes, gas_fees_bytes
+
+
+def _pack_operation(
+    user_op: Dict,
+    account_gas_limits_bytes: bytes,
+    gas_fees_bytes: bytes,
+    signature: bytes = b"",
+) -> Tuple:
+    """Pack a user operation for handleOps.
+
+    Args:
+        user_op: User operation dictionary
+        account_gas_limits_bytes: Packed gas limits
+        gas_fees_bytes: Packed gas fees
+
+    Returns:
+        Packed operation tuple
+    """
+    return (
+        user_op["sender"],
+        user_op["nonce"],
+        user_op["initCode"],
+        user_op["callData"],
+        account_gas_limits_bytes,
+        user_op["preVerificationGas"],
+        gas_fees_bytes,
+        user_op["paymasterAndData"],
+        signature,
+    )
+
+
+class _BundlerTxCache:
+    """Caches the gas price and tracks bundler nonces between operations.
+
+    The gas price is reused for a short time, and the next nonce of each sender
+    is counted locally once a transaction has been sent, so consecutive
+    operations do not have to fetch them again.
+    """
+
+    def __init__(self, gas_price_ttl: float = GAS_PRICE_TTL) -> None:
+        """Initialize the bundler transaction cache.
+
+        Args:
+            gas_price_ttl: Number of seconds a cached gas price remains valid
+        """
+        self.gas_price_ttl = gas_price_ttl
+        self._gas_price: Optional[Tuple[float, int]] = None
+        self._nonces: Dict[str, int] = {}
+
+    def get_gas_price(self) -> Optional[int]:
+        """Get the cached gas price, or None if not cached or expired."""
+        if (
+            self._gas_price is not None
+            and time.monotonic() - self._gas_price[0] < self.gas_price_ttl
+        ):
+            return self._gas_price[1]
+        return None
+
+    def set_gas_price(self, gas_price: int) -> None:
+        """Cache a freshly fetched gas price."""
+        self._gas_price = (time.monotonic(), gas_price)
+
+    def get_nonce(self, address: str) -> Optional[int]:
+        """Get the next nonce of a sender, or None if it is not being tracked."""
+        return self._nonces.get(address)
+
+    def sent(self, address: str, nonce: int) -> None:
+        """Record that a transaction with the given nonce was sent."""
+        self._nonces[address] = nonce + 1
+
+    def rejected(self, address: str) -> None:
+        """Record that a transaction of a sender was rejected.
+
+        The nonce and the gas price may be what the node rejected, so both are
+        fetched again for the next transaction.
+        """
+        self._nonces.pop(address, None)
+        self._gas_price = None
+
+
+class _ReceiptWaiter:
+    """Waits for transaction receipts, checking once per new block.
+
+    Receipts only appear when a block is mined, so with a persistent connection
+    provider the waiter subscribes to newHeads and checks the pending hashes
+    when a block arrives. Other providers fall back to polling for the receipt.
+    """
+
+    def __init__(self, w3: AsyncWeb3) -> None:
+        """Initialize the receipt waiter.
+
+        Args:
+            w3: AsyncWeb3 instance to wait for receipts with
+        """
+        self.w3 = w3
+        self._pending: Dict[HexBytes, asyncio.Future] = {}
+        self._subscription_id: Optional[HexStr] = None
+        self._watcher: Optional[asyncio.Task] = None
+        # Held while subscribing or unsubscribing, so concurrent waits share one
+        # subscription
+        self._lock = asyncio.Lock()
+
+    async def wait(self, txn_hash: HexBytes, timeout: float = 120) -> TxReceipt:
+        """Wait for a transaction to be mined.
+
+        Args:
+            txn_hash: Hash of the transaction to wait for
+            timeout: Number of seconds to wait before giving up
+
+        Returns:
+            Transaction receipt
+        """
+        if not isinstance(self.w3.provider, PersistentConnectionProvider):
+            return await self.w3.eth.wait_for_transaction_receipt(
+                txn_hash, timeout=timeout, poll_latency=RECEIPT_POLL_LATENCY
+            )
+
+        txn_hash = HexBytes(txn_hash)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[txn_hash] = future
+        try:
+            await self._start()
+
+            # The transaction may have been mined before the subscription started
+            txn_receipt = await self._get_receipt(txn_hash)
+            if txn_receipt is not None:
+                return txn_receipt
 
-class UserOperationManager:
-    """Manages user operation execution."""
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise TimeExhausted(
+                f"Transaction {txn_hash.to_0x_hex()} is not in the chain after {timeout} seconds"
+            )
+        finally:
+            self._pending.pop(txn_hash, None)
+            if not self._pending:
+                await self._stop()
+
+    async def _start(self) -> None:
+        """Start watching for new blocks, unless already watching."""
+        async with self._lock:
+            if self._subscription_id is None:
+                self._subscription_id = await self.w3.eth.subscribe("newHeads")
+                self._watcher = asyncio.create_task(self._watch_heads())
+
+    async def _watch_heads(self) -> None:
+        """Check the pending transactions each time a new block arrives."""
+        try:
+            async for _ in self.w3.socket.process_subscriptions():
+                for txn_hash, future in list(self._pending.items()):
+                    if future.done():
+                        continue
+                    txn_receipt = await self._get_receipt(txn_hash)
+                    if txn_receipt is not None and not future.done():
+                        future.set_result(txn_receipt)
+        except Exception as e:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(e)
+
+    async def _get_receipt(self, txn_hash: HexBytes) -> Optional[TxReceipt]:
+        try:
+            return await self.w3.eth.get_transaction_receipt(txn_hash)
+        except TransactionNotFound:
+            return None
+
+    async def _stop(self) -> None:
+        """Stop watching for new blocks once nothing is waiting."""
+        async with self._lock:
+            # Another wait may have started while the lock was held
+            if self._pending:
+                return
+
+            watcher, self._watcher = self._watcher, None
+            if watcher is not None:
+                watcher.cancel()
+
+            subscription_id, self._subscription_id = self._subscription_id, None
+            if subscription_id is not None:
+                try:
+                    await self.w3.eth.unsubscribe(subscription_id)
+                except Web3Exception:
+                    pass
+
+
+class AsyncUserOperationManager:
+    """Manages user operation execution, making independent requests concurrently."""
+
+    __slots__ = (
+        "w3",
+        "accounts",
+        "contracts",
+        "_entry_point",
+        "_chain_id",
+        "_tx_cache",
+        "_receipt_waiter",
+    )
 
     def __init__(
-        self, w3: Web3, accounts: AccountManager, contracts: ContractManager
+        self, w3: AsyncWeb3, accounts: AccountManager, contracts: ContractManager
     ) -> None:
-        """Initialize the user operation manager.
+        """Initialize the async user operation manager.
 
         Args:
-            w3: Web3 instance to use for operation execution
+            w3: AsyncWeb3 instance to use for operation execution
+            accounts: Account manager holding the owner, bundler and beneficiary
+            contracts: Contract manager holding the deployed contracts
         """
         self.w3 = w3
         self.accounts = accounts
         self.contracts = contracts
+        self._entry_point: Optional[AsyncContract] = None
+        self._chain_id: Optional[int] = None
+        self._tx_cache = _BundlerTxCache()
+        self._receipt_waiter = _ReceiptWaiter(w3)
+
+    @property
+    def entry_point(self) -> AsyncContract:
+        """Async handle to the deployed EntryPoint contract."""
+        entry_point = self.contracts.entry_point
+        if (
+            self._entry_point is None
+            or self._entry_point.address != entry_point.address
+        ):
+            self._entry_point = self.w3.eth.contract(
+                address=entry_point.address, abi=entry_point.abi
+            )
+        return self._entry_point
+
+    async def _get_chain_id(self) -> int:
+        """Get the ID of the connected chain, fetched once and cached."""
+        if self._chain_id is None:
+            self._chain_id = await self.w3.eth.chain_id
+        return self._chain_id
+
+    async def _fetch_preflight(self, bundler_address: str) -> Tuple[int, int, int, int]:
+        """Fetch the reads needed before executing a user operation.
+
+        The chain ID, a recent gas price and the bundler nonce are taken from the
+        cache when available. The remaining reads are independent, so they are
+        made in a single batch request, or concurrently if the provider does not
+        support batch requests.
+
+        Args:
+            bundler_address: Address of the bundler sending handleOps
+
+        Returns:
+            Tuple of (bundler nonce, gas price, chain ID, user operation nonce)
+        """
+        get_nonce = self.entry_point.functions.getNonce(
+            self.contracts.simple_account.address, 0
+        )
+
+        reads: Dict[str, Callable[[], Any]] = {}
+        nonce = self._tx_cache.get_nonce(bundler_address)
+        if nonce is None:
+            reads["nonce"] = lambda: self.w3.eth.get_transaction_count(bundler_address)
+        gas_price = self._tx_cache.get_gas_price()
+        if gas_price is None:
+            reads["gas_price"] = lambda: self.w3.eth.gas_price
+        if self._chain_id is None:
+            reads["chain_id"] = lambda: self.w3.eth.chain_id
+
+        try:
+            async with self.w3.batch_requests() as batch:
+                batch.add(get_nonce)
+                for read in reads.values():
+                    batch.add(read())
+                op_nonce, *values = await batch.async_execute()
+        except (Web3TypeError, Web3RPCError):
+            op_nonce, *values = await asyncio.gather(
+                get_nonce.call(), *(read() for read in reads.values())
+            )
+        results = dict(zip(reads, values))
+
+        if "nonce" in results:
+            nonce = results["nonce"]
+        if "gas_price" in results:
+            gas_price = results["gas_price"]
+            self._tx_cache.set_gas_price(gas_price)
+        if "chain_id" in results:
+            self._chain_id = results["chain_id"]
 
-    def execute_operation(self, target: str, value: int, data: str) -> TxReceipt:
+        return nonce, gas_price, await self._get_chain_id(), op_nonce
+
+    async def execute_operation(self, target: str, value: int, data: str) -> TxReceipt:
         """Execute a user operation.
 
         Args:
@@ -33,38 +485,39 @@ class UserOperationManager:
         Returns:
             Transaction receipt
         """
+        bundler = self.accounts.bundler
+
+        # Fetch whatever the operation and bundler transaction need at once
+        nonce, gas_price, chain_id, op_nonce = await self._fetch_preflight(
+            bundler.address
+        )
+
         # Build the user operation
-        user_op, account_gas_limits_bytes, gas_fees_bytes = self._build_operation(
-            target, value, data
+        user_op, account_gas_limits_bytes, gas_fees_bytes = await self._build_operation(
+            target, value, data, op_nonce
         )
 
         # Sign the operation
-        user_op["signature"] = self._sign_operation(
+        signature, packed_user_op_no_sig = await self._sign_operation(
             user_op, account_gas_limits_bytes, gas_fees_bytes
         )
+        user_op["signature"] = signature
 
-        # Pack the operation for handleOps
-        packed_user_op = self._pack_operation(
-            user_op,
-            account_gas_limits_bytes,
-            gas_fees_bytes,
-            user_op["signature"],
-        )
+        # Pack the operation for handleOps, reusing the packing used for signing
+        packed_user_op = packed_user_op_no_sig[:-1] + (signature,)
 
         # Execute the operation
         try:
-            tx = self.contracts.entry_point.functions.handleOps(
+            tx = await self.entry_point.functions.handleOps(
                 [packed_user_op],
                 self.accounts.beneficiary.address,
             ).build_transaction(
                 {
-                    "from": self.accounts.bundler.address,
-                    "nonce": self.w3.eth.get_transaction_count(
-                        self.accounts.bundler.address
-                    ),
-                    "maxFeePerGas": self.w3.eth.gas_price,
-                    "maxPriorityFeePerGas": self.w3.eth.gas_price,
-                    "chainId": self.w3.eth.chain_id,
+                    "from": bundler.address,
+                    "nonce": nonce,
+                    "maxFeePerGas": gas_price,
+                    "maxPriorityFeePerGas": gas_price,
+                    "chainId": chain_id,
                     "gas": 2_000_000,
                 }
             )
@@ -74,20 +527,22 @@ class UserOperationManager:
         # Sign the transaction
         try:
             signed_tx = self.w3.eth.account.sign_transaction(
-                tx, private_key=self.accounts.bundler.key
+                tx, private_key=bundler.key
             )
         except Exception as e:
             raise Exception(f"Error signing transaction: {e}")
 
-        # Send the transaction
+        # Send the transaction, refetching the nonce and gas price if it was rejected
         try:
-            txn_hash = self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+            txn_hash = await self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
         except Exception as e:
+            self._tx_cache.rejected(bundler.address)
             raise Exception(f"Error sending transaction: {e}")
+        self._tx_cache.sent(bundler.address, nonce)
 
-        # Wait for the transaction to be mined
+        # Wait for the transaction to be mined without blocking the event loop
         try:
-            txn_receipt = self.w3.eth.wait_for_transaction_receipt(txn_hash)
+            txn_receipt = await self._receipt_waiter.wait(txn_hash)
 
             if txn_receipt["status"] == 0:
                 raise Exception("Transaction reverted")
@@ -98,8 +553,8 @@ class UserOperationManager:
 
         return txn_receipt
 
-    def _build_operation(
-        self, target: str, value: int, data: str
+    async def _build_operation(
+        self, target: str, value: int, data: str, nonce: Optional[int] = None
     ) -> Tuple[Dict, bytes, bytes]:
         """Build a user operation.
 
@@ -107,52 +562,27 @@ class UserOperationManager:
             target: Target address for the operation
             value: Value to send with the operation (in Wei)
             data: Data to send with the operation
+            nonce: EntryPoint nonce of the SimpleAccount, fetched if not given
 
         Returns:
             Tuple of (user operation dict, gas limits bytes, gas fees bytes)
         """
+        simple_account = self.contracts.simple_account
+
         # Encode the execute call
-        call_data = self.contracts.simple_account.encode_abi(
-            "execute", args=[target, value, data]
-        )
+        call_data = _encode_execute(target, value, data)
 
         # Get the nonce from EntryPoint
-        nonce = self.contracts.entry_point.functions.getNonce(
-            self.contracts.simple_account.address, 0
-        ).call()
-
-        # Build the operation
-        user_op = {
-            "sender": self.contracts.simple_account.address,
-            "nonce": nonce,
-            "initCode": "0x",
-            "callData": call_data,
-            "callGasLimit": 1_000_000,
-            "verificationGasLimit": 1_000_000,
-            "preVerificationGas": 1_000_000,
-            "maxFeePerGas": self.w3.to_wei(2, "gwei"),
-            "maxPriorityFeePerGas": self.w3.to_wei(1, "gwei"),
-            "paymasterAndData": "0x",
-            "signature": "0x",
-        }
-
-        # Pack gas limits and fees
-        vgas = user_op["verificationGasLimit"]
-        cgas = user_op["callGasLimit"]
-        maxPr = user_op["maxPriorityFeePerGas"]
-        maxF = user_op["maxFeePerGas"]
-
-        account_gas_limits = (vgas << 128) | cgas
-        account_gas_limits_bytes = account_gas_limits.to_bytes(32, "big")
-
-        gas_fees = (maxPr << 128) | maxF
-        gas_fees_bytes = gas_fees.to_bytes(32, "big")
-
-        return user_op, account_gas_limits_bytes, gas_fees_bytes
-
-    def _sign_operation(
+        if nonce is None:
+            nonce = await self.entry_point.functions.getNonce(
+                simple_account.address, 0
+            ).call()
+
+        return _assemble_operation(call_data, nonce, simple_account.address)
+
+    async def _sign_operation(
         self, user_op: Dict, account_gas_limits_bytes: bytes, gas_fees_bytes: bytes
-    ) -> bytes:
+    ) -> Tuple[bytes, Tuple]:
         """Sign a user operation.
 
         Args:
@@ -161,50 +591,22 @@ class UserOperationManager:
             gas_fees_bytes: Packed gas fees
 
         Returns:
-            Operation signature
+            Tuple of (operation signature, packed operation without signature)
         """
-        # Use the _pack_operation method to pack the user operation for signature hash computation
-        packed_user_op_no_sig = self._pack_operation(
+        packed_user_op_no_sig = _pack_operation(
             user_op, account_gas_limits_bytes, gas_fees_bytes
         )
 
-        # Get the operation hash
-        user_op_hash = self.contracts.entry_point.functions.getUserOpHash(
-            packed_user_op_no_sig
-        ).call()
+        # Hash the operation locally instead of calling getUserOpHash
+        user_op_hash = _user_op_hash(
+            packed_user_op_no_sig,
+            self.contracts.entry_point.address,
+            await self._get_chain_id(),
+        )
 
         # Sign the hash
         signed_message = self.w3.eth.account._sign_hash(
             user_op_hash, private_key=self.accounts.owner.key
         )
 
-        return signed_message.signature
-
-    def _pack_operation(
-        self,
-        user_op: Dict,
-        account_gas_limits_bytes: bytes,
-        gas_fees_bytes: bytes,
-        signature: bytes = b"",
-    ) -> Tuple:
-        """Pack a user operation for handleOps.
-
-        Args:
-            user_op: User operation dictionary
-            account_gas_limits_bytes: Packed gas limits
-            gas_fees_bytes: Packed gas fees
-
-        Returns:
-            Packed operation tuple
-        """
-        return (
-            user_op["sender"],
-            user_op["nonce"],
-            self.w3.to_bytes(hexstr=user_op["initCode"][2:]),
-            self.w3.to_bytes(hexstr=user_op["callData"][2:]),
-            account_gas_limits_bytes,
-            user_op["preVerificationGas"],
-            gas_fees_bytes,
-            self.w3.to_bytes(hexstr=user_op["paymasterAndData"][2:]),
-            signature,
-        )
+        return signed_message.signature, packed_user_op_no_sig
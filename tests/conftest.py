@@ -0,0 +1,188 @@
+import asyncio
+import time
+
+import pytest
+from eth_abi import encode
+from eth_typing import HexStr
+from hexbytes import HexBytes
+from web3.exceptions import TransactionNotFound
+from web3.providers.persistent import PersistentConnectionProvider
+
+ENTRY_POINT_ADDRESS = "0x5FbDB2315678afecb367f032d93F642f64180aa3"
+SIMPLE_ACCOUNT_ADDRESS = "0xe7f1725E7734CE288F8367e1Bb143E90bb3F0512"
+TARGET_ADDRESS = "0x9fE46736679d2D9a65F0992F2272dE9f3c7fa6e0"
+FUNDER_ADDRESS = "0xf39Fd6e51aad88F6F4ce6aB8827279cffFb92266"
+
+BLOCK_HASH = HexBytes(b"\xbb" * 32)
+TXN_HASH = HexBytes(b"\x01" * 32)
+
+
+class FakeEth:
+    """Records the requests made to it and answers them from its attributes."""
+
+    def __init__(self):
+        self.accounts = [FUNDER_ADDRESS]
+        self.default_account = None
+        self.code = b""
+        self.return_values = ()
+        self.balances = {}
+        self.logs = []
+        self.receipts = {}
+        self.get_logs_error = None
+        self.send_error = None
+        self.calls = []
+        self.log_filters = []
+        self.sent = []
+        self.waited = []
+        self.get_code_calls = 0
+        self.get_balance_calls = 0
+
+    def get_code(self, address):
+        self.get_code_calls += 1
+        return self.code
+
+    def get_balance(self, address):
+        self.get_balance_calls += 1
+        return self.balances[address]
+
+    def call(self, transaction):
+        self.calls.append(transaction)
+        return encode(
+            ["(bool,bytes)[]"],
+            [[(True, encode(["uint256"], [value])) for value in self.return_values]],
+        )
+
+    def get_logs(self, log_filter):
+        self.log_filters.append(log_filter)
+        if self.get_logs_error is not None:
+            raise self.get_logs_error
+        return self.logs
+
+    def send_transaction(self, transaction):
+        if self.send_error is not None:
+            raise self.send_error
+        self.sent.append(transaction)
+        txn_hash = HexBytes(len(self.sent).to_bytes(32, "big"))
+        self.receipts[txn_hash] = {
+            "transactionHash": txn_hash,
+            "to": transaction["to"],
+            "status": 1,
+        }
+        return txn_hash
+
+    def get_transaction_receipt(self, txn_hash):
+        return self.receipts[HexBytes(txn_hash)]
+
+    def wait_for_transaction_receipt(self, txn_hash, poll_latency):
+        self.waited.append(HexBytes(txn_hash))
+        return self.receipts[HexBytes(txn_hash)]
+
+
+class FakeBatch:
+    """Collects the results of the requests added to it.
+
+    The fake requests are answered when made, so the batch only records them.
+    """
+
+    def __init__(self, w3):
+        self.w3 = w3
+        self.results = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def add(self, result):
+        self.results.append(result)
+
+    def execute(self):
+        if self.w3.batch_error is not None:
+            raise self.w3.batch_error
+        self.w3.batches.append(self.results)
+        return self.results
+
+
+class FakeWeb3:
+    def __init__(self, eth):
+        self.eth = eth
+        self.batches = []
+        self.batch_error = None
+
+    def batch_requests(self):
+        return FakeBatch(self)
+
+
+@pytest.fixture
+def fake_eth():
+    return FakeEth()
+
+
+@pytest.fixture
+def fake_w3(fake_eth):
+    return FakeWeb3(fake_eth)
+
+
+class FakePersistentProvider(PersistentConnectionProvider):
+    async def socket_send(self, request_data):
+        pass
+
+    async def socket_recv(self):
+        pass
+
+
+class FakeSocket:
+    def __init__(self):
+        self.heads = asyncio.Queue()
+
+    async def process_subscriptions(self):
+        while True:
+            yield await self.heads.get()
+
+
+class FakeAsyncEth:
+    def __init__(self):
+        self.receipts = {}
+        self.subscriptions = []
+        self.unsubscribed = []
+        self.polled = []
+
+    async def subscribe(self, subscription_type):
+        # Yield first, as a real subscription waits for the node to reply
+        await asyncio.sleep(0)
+        self.subscriptions.append(subscription_type)
+        return HexStr(f"0x{len(self.subscriptions)}")
+
+    async def unsubscribe(self, subscription_id):
+        self.unsubscribed.append(subscription_id)
+        return True
+
+    async def get_transaction_receipt(self, txn_hash):
+        try:
+            return self.receipts[HexBytes(txn_hash)]
+        except KeyError:
+            raise TransactionNotFound(f"{txn_hash!r} not found")
+
+    async def wait_for_transaction_receipt(self, txn_hash, timeout, poll_latency):
+        self.polled.append(txn_hash)
+        return self.receipts[HexBytes(txn_hash)]
+
+
+class FakeAsyncWeb3:
+    def __init__(self, provider):
+        self.provider = provider
+        self.eth = FakeAsyncEth()
+        self.socket = FakeSocket()
+
+
+@pytest.fixture
+def persistent_w3():
+    return FakeAsyncWeb3(FakePersistentProvider.__new__(FakePersistentProvider))
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    return now
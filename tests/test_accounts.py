@@ -0,0 +1,205 @@
+from types import SimpleNamespace
+
+import pytest
+from conftest import (
+    ENTRY_POINT_ADDRESS,
+    FUNDER_ADDRESS,
+    SIMPLE_ACCOUNT_ADDRESS,
+    TARGET_ADDRESS,
+)
+from web3.exceptions import Web3RPCError, Web3TypeError
+
+from eip_4337.accounts import AccountManager, _BalanceCache, get_balances
+from eip_4337.multicall import MulticallClient
+
+RECIPIENTS = [ENTRY_POINT_ADDRESS, SIMPLE_ACCOUNT_ADDRESS, TARGET_ADDRESS]
+
+
+@pytest.fixture
+def balance_cache(monkeypatch):
+    cache = _BalanceCache()
+    monkeypatch.setattr(AccountManager, "_balance_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def account_manager(fake_w3, balance_cache):
+    return AccountManager(fake_w3)
+
+
+def send_funding(account_manager, recipients=RECIPIENTS):
+    return account_manager._send_funding_transactions(
+        [account_manager._funding_transaction(to, 10**18) for to in recipients]
+    )
+
+
+def test_send_funding_transactions_does_not_wait(account_manager, fake_eth):
+    txn_hashes = send_funding(account_manager)
+
+    assert [tx["to"] for tx in fake_eth.sent] == RECIPIENTS
+    assert all(tx["from"] == FUNDER_ADDRESS for tx in fake_eth.sent)
+    assert len(txn_hashes) == 3
+    assert fake_eth.waited == []
+
+
+def test_send_funding_transactions_reports_recipient(account_manager, fake_eth):
+    fake_eth.send_error = ValueError("insufficient funds")
+
+    with pytest.raises(Exception, match=f"Failed to fund account: {TARGET_ADDRESS}"):
+        send_funding(account_manager, [TARGET_ADDRESS])
+
+
+def test_wait_for_funding_waits_on_last_hash(account_manager, fake_w3, fake_eth):
+    txn_hashes = send_funding(account_manager)
+
+    account_manager._wait_for_funding(txn_hashes)
+
+    assert fake_eth.waited == [txn_hashes[-1]]
+    assert fake_w3.batches == [[fake_eth.receipts[h] for h in txn_hashes[:-1]]]
+
+
+def test_wait_for_funding_single_transaction_skips_batch(
+    account_manager, fake_w3, fake_eth
+):
+    txn_hash = account_manager.fund_account(TARGET_ADDRESS, 10**18)
+
+    assert fake_eth.waited == [txn_hash]
+    assert fake_w3.batches == []
+
+
+def test_wait_for_funding_without_transactions(account_manager, fake_w3, fake_eth):
+    account_manager._wait_for_funding([])
+
+    assert fake_eth.waited == []
+    assert fake_w3.batches == []
+
+
+def test_wait_for_funding_raises_on_failed_transaction(account_manager, fake_eth):
+    txn_hashes = send_funding(account_manager)
+    fake_eth.receipts[txn_hashes[1]]["status"] = 0
+
+    with pytest.raises(
+        Exception, match=f"Failed to fund account: {SIMPLE_ACCOUNT_ADDRESS}"
+    ):
+        account_manager._wait_for_funding(txn_hashes)
+
+
+def test_get_transaction_receipts_batches(account_manager, fake_w3, fake_eth):
+    txn_hashes = send_funding(account_manager)
+
+    receipts = account_manager.get_transaction_receipts(txn_hashes)
+
+    assert receipts == [fake_eth.receipts[h] for h in txn_hashes]
+    assert fake_w3.batches == [receipts]
+
+
+def test_get_transaction_receipts_without_hashes(account_manager, fake_w3):
+    assert account_manager.get_transaction_receipts([]) == []
+    assert fake_w3.batches == []
+
+
+@pytest.mark.parametrize(
+    "batch_error",
+    [Web3TypeError("batching not supported"), Web3RPCError("batch rejected")],
+)
+def test_get_transaction_receipts_falls_back_to_sequential(
+    account_manager, fake_w3, fake_eth, batch_error
+):
+    txn_hashes = send_funding(account_manager)
+    fake_w3.batch_error = batch_error
+
+    receipts = account_manager.get_transaction_receipts(txn_hashes)
+
+    assert receipts == [fake_eth.receipts[h] for h in txn_hashes]
+    assert fake_w3.batches == []
+
+
+@pytest.fixture
+def balances(fake_eth):
+    fake_eth.balances = dict(zip(RECIPIENTS, [1, 2, 3]))
+    return [1, 2, 3]
+
+
+def test_get_balances_through_multicall(fake_w3, fake_eth, balances):
+    fake_eth.code = b"\x60\x80"
+    fake_eth.return_values = balances
+
+    assert get_balances(fake_w3, RECIPIENTS, MulticallClient(fake_w3)) == balances
+    assert len(fake_eth.calls) == 1
+    assert fake_eth.get_balance_calls == 0
+    assert fake_w3.batches == []
+
+
+def test_get_balances_batches_without_multicall(fake_w3, fake_eth, balances):
+    assert get_balances(fake_w3, RECIPIENTS, MulticallClient(fake_w3)) == balances
+    assert fake_eth.calls == []
+    assert fake_w3.batches == [balances]
+
+
+@pytest.mark.parametrize(
+    "batch_error",
+    [Web3TypeError("batching not supported"), Web3RPCError("batch rejected")],
+)
+def test_get_balances_falls_back_to_sequential(
+    fake_w3, fake_eth, balances, batch_error
+):
+    fake_w3.batch_error = batch_error
+
+    assert get_balances(fake_w3, RECIPIENTS) == balances
+    assert fake_w3.batches == []
+
+
+def test_get_balances_without_addresses(fake_w3, fake_eth):
+    assert get_balances(fake_w3, []) == []
+    assert fake_eth.get_balance_calls == 0
+    assert fake_w3.batches == []
+
+
+def test_get_all_balances_maps_account_types(account_manager, fake_w3, fake_eth):
+    fake_eth.default_account = FUNDER_ADDRESS
+    fake_eth.balances = {FUNDER_ADDRESS: 100, ENTRY_POINT_ADDRESS: 1}
+    account_manager.owner = SimpleNamespace(address=ENTRY_POINT_ADDRESS)
+
+    assert account_manager.get_all_balances() == {"default": 100, "owner": 1}
+    assert fake_w3.batches == [[100, 1]]
+
+
+def test_balance_cache_expires(fake_w3, fake_eth, clock):
+    cache = _BalanceCache()
+    fake_eth.balances = {TARGET_ADDRESS: 5}
+
+    assert cache.get(fake_w3, TARGET_ADDRESS) == 5
+    fake_eth.balances[TARGET_ADDRESS] = 6
+    clock[0] += 0.25
+    assert cache.get(fake_w3, TARGET_ADDRESS) == 5
+    assert fake_eth.get_balance_calls == 1
+
+    clock[0] += 0.25
+    assert cache.get(fake_w3, TARGET_ADDRESS) == 6
+    assert fake_eth.get_balance_calls == 2
+
+
+def test_balance_cache_invalidate(fake_w3, fake_eth, clock):
+    cache = _BalanceCache()
+    fake_eth.balances = {TARGET_ADDRESS: 5, ENTRY_POINT_ADDRESS: 7}
+    cache.get(fake_w3, TARGET_ADDRESS)
+    cache.get(fake_w3, ENTRY_POINT_ADDRESS)
+
+    cache.invalidate(TARGET_ADDRESS, SIMPLE_ACCOUNT_ADDRESS)
+    cache.get(fake_w3, TARGET_ADDRESS)
+    cache.get(fake_w3, ENTRY_POINT_ADDRESS)
+
+    assert fake_eth.get_balance_calls == 3
+
+
+def test_funding_invalidates_cached_balances(account_manager, fake_w3, fake_eth, clock):
+    fake_eth.balances = {FUNDER_ADDRESS: 10**19, TARGET_ADDRESS: 0}
+    assert AccountManager.sufficient_balance(fake_w3, FUNDER_ADDRESS, 10)
+    assert not AccountManager.sufficient_balance(fake_w3, TARGET_ADDRESS, 1)
+
+    account_manager.fund_account(TARGET_ADDRESS, 10**19)
+    fake_eth.balances = {FUNDER_ADDRESS: 0, TARGET_ADDRESS: 10**19}
+
+    assert not AccountManager.sufficient_balance(fake_w3, FUNDER_ADDRESS, 10)
+    assert AccountManager.sufficient_balance(fake_w3, TARGET_ADDRESS, 10)
+    assert fake_eth.get_balance_calls == 4
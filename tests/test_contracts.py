@@ -0,0 +1,418 @@
+import re
+from pathlib import Path
+
+import pytest
+from conftest import (
+    BLOCK_HASH,
+    ENTRY_POINT_ADDRESS,
+    SIMPLE_ACCOUNT_ADDRESS,
+    TARGET_ADDRESS,
+    TXN_HASH,
+)
+from eth_abi import encode
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.exceptions import Web3RPCError
+
+from eip_4337 import contracts
+from eip_4337.contracts import (
+    ENTRY_POINT_SOURCE,
+    SOLC_VERSION,
+    ContractManager,
+    _cached_artifact,
+    _solidity_sources,
+)
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+ENTRY_POINT_ABI = [
+    {
+        "type": "event",
+        "name": "Deposited",
+        "anonymous": False,
+        "inputs": [
+            {"name": "account", "type": "address", "indexed": True},
+            {"name": "totalDeposit", "type": "uint256", "indexed": False},
+        ],
+    }
+]
+SIMPLE_ACCOUNT_ABI = [
+    {
+        "type": "event",
+        "name": "Executed",
+        "anonymous": False,
+        "inputs": [
+            {"name": "target", "type": "address", "indexed": True},
+            {"name": "value", "type": "uint256", "indexed": False},
+        ],
+    }
+]
+
+DEPOSITED_TOPIC = HexBytes(Web3.keccak(text="Deposited(address,uint256)"))
+EXECUTED_TOPIC = HexBytes(Web3.keccak(text="Executed(address,uint256)"))
+UNKNOWN_TOPIC = HexBytes(Web3.keccak(text="Unknown(uint256)"))
+
+
+@pytest.fixture
+def source_tree(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(contracts, "ARTIFACTS_DIR", Path(".build/artifacts"))
+
+    files = {
+        "contracts/core/Main.sol": (
+            'import "./Helpers.sol";\n'
+            'import {Lib} from "../utils/Lib.sol";\n'
+            'import "@openzeppelin/contracts/utils/Address.sol";\n'
+        ),
+        "contracts/core/Helpers.sol": 'import "./Main.sol";\n',
+        "contracts/utils/Lib.sol": "library Lib {}\n",
+        "contracts/Unused.sol": "contract Unused {}\n",
+        "node_modules/@openzeppelin/contracts/utils/Address.sol": (
+            "    import './Strings.sol';\n"
+        ),
+        "node_modules/@openzeppelin/contracts/utils/Strings.sol": "library Strings {}\n",
+    }
+    for path, text in files.items():
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_text(text)
+    return tmp_path
+
+
+class Compiler:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return {"abi": [], "bin": f"0x{self.calls:02x}"}
+
+
+def test_solidity_sources_resolves_imports(source_tree):
+    assert _solidity_sources("contracts/core/Main.sol") == [
+        Path("contracts/core/Helpers.sol"),
+        Path("contracts/core/Main.sol"),
+        Path("contracts/utils/Lib.sol"),
+        Path("node_modules/@openzeppelin/contracts/utils/Address.sol"),
+        Path("node_modules/@openzeppelin/contracts/utils/Strings.sol"),
+    ]
+
+
+def test_solidity_sources_missing_import(source_tree):
+    Path("contracts/utils/Lib.sol").write_text('import "./Missing.sol";\n')
+
+    with pytest.raises(FileNotFoundError):
+        _solidity_sources("contracts/core/Main.sol")
+
+
+def test_cached_artifact_compiles_once(source_tree):
+    sources = _solidity_sources("contracts/core/Main.sol")
+    compiler = Compiler()
+
+    first = _cached_artifact(sources, "0.8.20", compiler)
+    second = _cached_artifact(sources, "0.8.20", compiler)
+
+    assert compiler.calls == 1
+    assert first == second == {"abi": [], "bin": "0x01"}
+    assert len(list(contracts.ARTIFACTS_DIR.iterdir())) == 1
+
+
+def test_cached_artifact_recompiles_when_imported_source_changes(source_tree):
+    compiler = Compiler()
+    _cached_artifact(_solidity_sources("contracts/core/Main.sol"), "0.8.20", compiler)
+
+    Path("node_modules/@openzeppelin/contracts/utils/Strings.sol").write_text(
+        "library Strings { }\n"
+    )
+    artifact = _cached_artifact(
+        _solidity_sources("contracts/core/Main.sol"), "0.8.20", compiler
+    )
+
+    assert compiler.calls == 2
+    assert artifact["bin"] == "0x02"
+
+
+def test_cached_artifact_ignores_unimported_source(source_tree):
+    compiler = Compiler()
+    _cached_artifact(_solidity_sources("contracts/core/Main.sol"), "0.8.20", compiler)
+
+    Path("contracts/Unused.sol").write_text("contract Unused { }\n")
+    _cached_artifact(_solidity_sources("contracts/core/Main.sol"), "0.8.20", compiler)
+
+    assert compiler.calls == 1
+
+
+def test_cached_artifact_recompiles_when_compiler_changes(source_tree):
+    sources = _solidity_sources("contracts/core/Main.sol")
+    compiler = Compiler()
+
+    _cached_artifact(sources, "0.8.20", compiler)
+    _cached_artifact(sources, "0.8.21", compiler)
+
+    assert compiler.calls == 2
+
+
+def test_cached_artifact_replaces_corrupt_artifact(source_tree):
+    sources = _solidity_sources("contracts/core/Main.sol")
+    compiler = Compiler()
+    _cached_artifact(sources, "0.8.20", compiler)
+
+    (artifact_path,) = contracts.ARTIFACTS_DIR.iterdir()
+    artifact_path.write_text('{"abi": [')
+    artifact = _cached_artifact(sources, "0.8.20", compiler)
+
+    assert compiler.calls == 2
+    assert artifact == {"abi": [], "bin": "0x02"}
+    assert _cached_artifact(sources, "0.8.20", compiler) == artifact
+    assert compiler.calls == 2
+
+
+_PRAGMA_PATTERN = re.compile(r"^\s*pragma\s+solidity\s+([^;]+);", re.M)
+_CONSTRAINT_PATTERN = re.compile(r"(\^|~|>=|<=|>|<|=)?\s*(\d+)\.(\d+)\.(\d+)")
+
+
+def _satisfies(version, pragma):
+    version = tuple(int(part) for part in version.split("."))
+    for alternative in pragma.split("||"):
+        matched = True
+        for operator, *parts in _CONSTRAINT_PATTERN.findall(alternative):
+            bound = tuple(int(part) for part in parts)
+            if operator == "^":
+                upper = (0, bound[1] + 1, 0) if bound[0] == 0 else (bound[0] + 1, 0, 0)
+                matched &= bound <= version < upper
+            elif operator == "~":
+                matched &= bound <= version < (bound[0], bound[1] + 1, 0)
+            elif operator == ">=":
+                matched &= version >= bound
+            elif operator == "<=":
+                matched &= version <= bound
+            elif operator == ">":
+                matched &= version > bound
+            elif operator == "<":
+                matched &= version < bound
+            else:
+                matched &= version == bound
+        if matched:
+            return True
+    return False
+
+
+def _pragmas(sources):
+    return {
+        str(source): pragma
+        for source in sources
+        for pragma in _PRAGMA_PATTERN.findall(Path(source).read_text())
+    }
+
+
+def test_satisfies_pragma():
+    assert _satisfies("0.8.28", "^0.8.28")
+    assert not _satisfies("0.8.20", "^0.8.28")
+    assert not _satisfies("0.9.0", "^0.8.0")
+    assert _satisfies("0.8.28", ">=0.8.0 <0.9.0")
+    assert _satisfies("0.8.28", "0.7.6 || ^0.8.20")
+
+
+def test_solc_version_satisfies_local_sources():
+    pragmas = _pragmas(sorted((REPO_ROOT / "contracts").rglob("*.sol")))
+
+    assert pragmas
+    assert {
+        source: pragma
+        for source, pragma in pragmas.items()
+        if not _satisfies(SOLC_VERSION, pragma)
+    } == {}
+
+
+@pytest.mark.skipif(
+    not (REPO_ROOT / "node_modules/@openzeppelin/contracts").is_dir(),
+    reason="OpenZeppelin contracts are not installed",
+)
+def test_solc_version_satisfies_entry_point_sources(monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)
+    pragmas = _pragmas(_solidity_sources(ENTRY_POINT_SOURCE))
+
+    assert {
+        source: pragma
+        for source, pragma in pragmas.items()
+        if not _satisfies(SOLC_VERSION, pragma)
+    } == {}
+
+
+def test_background_install_and_compile_use_solc_version(monkeypatch):
+    installed = []
+    monkeypatch.setattr(contracts, "_solc_install", None)
+    monkeypatch.setattr(contracts, "get_installed_solc_versions", lambda: installed)
+    monkeypatch.setattr(contracts, "install_solc", installed.append)
+
+    contracts.start_solc_install().join()
+    contracts._ensure_solc()
+
+    assert installed == [SOLC_VERSION]
+
+
+def make_log(address, topic, account, value, txn_hash=TXN_HASH, log_index=0):
+    return {
+        "address": address,
+        "topics": [topic, HexBytes(encode(["address"], [account]))],
+        "data": HexBytes(encode(["uint256"], [value])),
+        "blockHash": BLOCK_HASH,
+        "blockNumber": 1,
+        "transactionHash": txn_hash,
+        "transactionIndex": 0,
+        "logIndex": log_index,
+        "removed": False,
+    }
+
+
+@pytest.fixture
+def manager(fake_w3):
+    manager = ContractManager(fake_w3)
+    manager.entry_point = Web3().eth.contract(
+        address=ENTRY_POINT_ADDRESS, abi=ENTRY_POINT_ABI
+    )
+    manager.simple_account = Web3().eth.contract(
+        address=SIMPLE_ACCOUNT_ADDRESS, abi=SIMPLE_ACCOUNT_ABI
+    )
+    return manager
+
+
+def test_get_filtered_logs_filters_by_address_and_topic(manager, fake_eth):
+    fake_eth.logs = [
+        make_log(ENTRY_POINT_ADDRESS, DEPOSITED_TOPIC, SIMPLE_ACCOUNT_ADDRESS, 5)
+    ]
+
+    logs = manager.retrieve_transaction_logs_from_txn_hash(
+        TXN_HASH.to_0x_hex(), BLOCK_HASH
+    )
+
+    (log_filter,) = fake_eth.log_filters
+    assert log_filter["blockHash"] == BLOCK_HASH
+    assert log_filter["address"] == [ENTRY_POINT_ADDRESS, SIMPLE_ACCOUNT_ADDRESS]
+    (topics,) = log_filter["topics"]
+    assert sorted(topics) == sorted(
+        [DEPOSITED_TOPIC.to_0x_hex(), EXECUTED_TOPIC.to_0x_hex()]
+    )
+    assert logs == [
+        {
+            "source": "EntryPoint",
+            "event": "Deposited",
+            "args": {"account": SIMPLE_ACCOUNT_ADDRESS, "totalDeposit": 5},
+        }
+    ]
+
+
+def test_txn_hash_logs_fall_back_to_receipt(manager, fake_eth):
+    receipt = {
+        "transactionHash": TXN_HASH,
+        "logs": [
+            make_log(ENTRY_POINT_ADDRESS, UNKNOWN_TOPIC, TARGET_ADDRESS, 1),
+            make_log(
+                SIMPLE_ACCOUNT_ADDRESS, EXECUTED_TOPIC, TARGET_ADDRESS, 7, log_index=1
+            ),
+        ],
+    }
+    fake_eth.receipts[TXN_HASH] = receipt
+    fake_eth.get_logs_error = Web3RPCError("eth_getLogs does not support blockHash")
+
+    logs = manager.retrieve_transaction_logs_from_txn_hash(
+        TXN_HASH.to_0x_hex(), BLOCK_HASH
+    )
+
+    assert len(fake_eth.log_filters) == 1
+    assert logs == [
+        {
+            "source": "SimpleAccount",
+            "event": "Executed",
+            "args": {"target": TARGET_ADDRESS, "value": 7},
+        }
+    ]
+
+
+def test_txn_hash_logs_without_block_hash_read_the_receipt(manager, fake_eth):
+    fake_eth.receipts[TXN_HASH] = {
+        "transactionHash": TXN_HASH,
+        "logs": [
+            make_log(ENTRY_POINT_ADDRESS, DEPOSITED_TOPIC, SIMPLE_ACCOUNT_ADDRESS, 5)
+        ],
+    }
+
+    logs = manager.retrieve_transaction_logs_from_txn_hash(TXN_HASH.to_0x_hex())
+
+    assert fake_eth.log_filters == []
+    assert logs == [
+        {
+            "source": "EntryPoint",
+            "event": "Deposited",
+            "args": {"account": SIMPLE_ACCOUNT_ADDRESS, "totalDeposit": 5},
+        }
+    ]
+
+
+def test_txn_hash_logs_do_not_hide_other_errors(manager, fake_eth):
+    fake_eth.get_logs_error = ValueError("bad filter")
+
+    with pytest.raises(ValueError):
+        manager.retrieve_transaction_logs_from_txn_hash(
+            TXN_HASH.to_0x_hex(), BLOCK_HASH
+        )
+
+
+def test_logs_for_block_range_grouped_by_transaction(manager, fake_eth):
+    other_txn_hash = HexBytes(b"\x02" * 32)
+    fake_eth.logs = [
+        make_log(ENTRY_POINT_ADDRESS, DEPOSITED_TOPIC, SIMPLE_ACCOUNT_ADDRESS, 5),
+        make_log(
+            SIMPLE_ACCOUNT_ADDRESS,
+            EXECUTED_TOPIC,
+            TARGET_ADDRESS,
+            3,
+            txn_hash=other_txn_hash,
+            log_index=1,
+        ),
+        make_log(
+            SIMPLE_ACCOUNT_ADDRESS, EXECUTED_TOPIC, TARGET_ADDRESS, 1, log_index=2
+        ),
+    ]
+
+    logs_by_txn = manager.retrieve_logs_for_block_range(10, "latest")
+
+    (log_filter,) = fake_eth.log_filters
+    assert log_filter["fromBlock"] == 10
+    assert log_filter["toBlock"] == "latest"
+    assert "blockHash" not in log_filter
+    assert log_filter["address"] == [ENTRY_POINT_ADDRESS, SIMPLE_ACCOUNT_ADDRESS]
+    assert list(logs_by_txn) == [TXN_HASH.to_0x_hex(), other_txn_hash.to_0x_hex()]
+    assert [log["args"] for log in logs_by_txn[TXN_HASH.to_0x_hex()]] == [
+        {"account": SIMPLE_ACCOUNT_ADDRESS, "totalDeposit": 5},
+        {"target": TARGET_ADDRESS, "value": 1},
+    ]
+    assert logs_by_txn[other_txn_hash.to_0x_hex()] == [
+        {
+            "source": "SimpleAccount",
+            "event": "Executed",
+            "args": {"target": TARGET_ADDRESS, "value": 3},
+        }
+    ]
+
+
+def test_get_filtered_logs_only_returns_the_transaction_logs(manager, fake_eth):
+    other_txn_hash = HexBytes(b"\x02" * 32)
+    fake_eth.logs = [
+        make_log(
+            SIMPLE_ACCOUNT_ADDRESS,
+            EXECUTED_TOPIC,
+            TARGET_ADDRESS,
+            3,
+            txn_hash=other_txn_hash,
+        ),
+        make_log(
+            SIMPLE_ACCOUNT_ADDRESS, EXECUTED_TOPIC, TARGET_ADDRESS, 1, log_index=1
+        ),
+    ]
+
+    logs = manager.get_filtered_logs(TXN_HASH.to_0x_hex(), BLOCK_HASH)
+
+    assert [log["args"] for log in logs] == [{"target": TARGET_ADDRESS, "value": 1}]
+    assert (
+        manager.get_filtered_logs(HexBytes(b"\x03" * 32).to_0x_hex(), BLOCK_HASH) == []
+    )
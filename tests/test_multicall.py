@@ -0,0 +1,125 @@
+import pytest
+from conftest import ENTRY_POINT_ADDRESS, SIMPLE_ACCOUNT_ADDRESS
+from eth_abi import decode, encode
+from web3 import Web3
+
+from eip_4337.constants import MULTICALL3_ADDRESS
+from eip_4337.multicall import MulticallClient
+
+MULTICALL3_ABI = [
+    {
+        "type": "function",
+        "name": "aggregate3",
+        "stateMutability": "payable",
+        "inputs": [
+            {
+                "name": "calls",
+                "type": "tuple[]",
+                "components": [
+                    {"name": "target", "type": "address"},
+                    {"name": "allowFailure", "type": "bool"},
+                    {"name": "callData", "type": "bytes"},
+                ],
+            }
+        ],
+        "outputs": [
+            {
+                "name": "returnData",
+                "type": "tuple[]",
+                "components": [
+                    {"name": "success", "type": "bool"},
+                    {"name": "returnData", "type": "bytes"},
+                ],
+            }
+        ],
+    },
+    {
+        "type": "function",
+        "name": "getEthBalance",
+        "stateMutability": "view",
+        "inputs": [{"name": "addr", "type": "address"}],
+        "outputs": [{"name": "balance", "type": "uint256"}],
+    },
+]
+
+
+@pytest.fixture
+def multicall3():
+    return Web3().eth.contract(address=MULTICALL3_ADDRESS, abi=MULTICALL3_ABI)
+
+
+def test_eth_balance_call_matches_abi(multicall3, fake_w3):
+    client = MulticallClient(fake_w3)
+
+    assert client.eth_balance_call(ENTRY_POINT_ADDRESS) == (
+        MULTICALL3_ADDRESS,
+        False,
+        bytes.fromhex(
+            multicall3.encode_abi("getEthBalance", [ENTRY_POINT_ADDRESS])[2:]
+        ),
+    )
+
+
+def test_aggregate3_uint256_round_trip(multicall3, fake_w3):
+    fake_w3.eth.return_values = [5, 10**18, 0]
+    client = MulticallClient(fake_w3)
+    calls = [
+        client.eth_balance_call(ENTRY_POINT_ADDRESS),
+        client.eth_balance_call(SIMPLE_ACCOUNT_ADDRESS),
+        (ENTRY_POINT_ADDRESS, True, b"\x70\xa0\x82\x31"),
+    ]
+
+    assert client.aggregate3_uint256(calls) == [5, 10**18, 0]
+
+    (transaction,) = fake_w3.eth.calls
+    assert transaction["to"] == MULTICALL3_ADDRESS
+    data = transaction["data"]
+    assert data[:4] == Web3.keccak(text="aggregate3((address,bool,bytes)[])")[:4]
+    assert data == bytes.fromhex(multicall3.encode_abi("aggregate3", [calls])[2:])
+    assert decode(["(address,bool,bytes)[]"], data[4:])[0] == tuple(
+        (target.lower(), allow_failure, call_data)
+        for target, allow_failure, call_data in calls
+    )
+
+
+def test_eth_balances_keeps_address_order(fake_w3):
+    fake_w3.eth.return_values = [1, 2]
+    client = MulticallClient(fake_w3)
+
+    assert client.eth_balances([ENTRY_POINT_ADDRESS, SIMPLE_ACCOUNT_ADDRESS]) == [1, 2]
+
+    (calls,) = decode(["(address,bool,bytes)[]"], fake_w3.eth.calls[0]["data"][4:])
+    assert [decode(["address"], call[2][4:])[0] for call in calls] == [
+        ENTRY_POINT_ADDRESS.lower(),
+        SIMPLE_ACCOUNT_ADDRESS.lower(),
+    ]
+
+
+def test_aggregate3_reports_failed_calls(fake_w3):
+    fake_w3.eth.call = lambda transaction: encode(
+        ["(bool,bytes)[]"], [[(False, b"revert"), (True, b"")]]
+    )
+    client = MulticallClient(fake_w3)
+
+    assert client.aggregate3([]) == [(False, b"revert"), (True, b"")]
+
+
+def test_is_available_is_cached(fake_w3):
+    eth = fake_w3.eth
+    client = MulticallClient(fake_w3)
+
+    assert client.is_available() is False
+    eth.code = b"\x60\x80"
+    assert client.is_available() is False
+    assert eth.get_code_calls == 1
+
+
+def test_is_available_refresh(fake_w3):
+    eth = fake_w3.eth
+    client = MulticallClient(fake_w3)
+    client.is_available()
+
+    eth.code = b"\x60\x80"
+    assert client.is_available(refresh=True) is True
+    assert client.is_available() is True
+    assert eth.get_code_calls == 2
@@ -0,0 +1,379 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from conftest import (
+    ENTRY_POINT_ADDRESS,
+    SIMPLE_ACCOUNT_ADDRESS,
+    TARGET_ADDRESS,
+    FakeAsyncEth,
+    FakeAsyncWeb3,
+)
+from eth_abi import decode
+from eth_account import Account
+from eth_account.messages import encode_typed_data
+from eth_account.typed_transactions import TypedTransaction
+from eth_utils import keccak
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.exceptions import TimeExhausted
+
+from eip_4337.user_ops import (
+    EXECUTE_SELECTOR,
+    AsyncUserOperationManager,
+    _BundlerTxCache,
+    _encode_execute,
+    _ReceiptWaiter,
+    _pack_uint128_pair,
+    _user_op_hash,
+)
+
+BUNDLER = Account.from_key(b"\x01" * 32)
+OWNER = Account.from_key(b"\x02" * 32)
+
+EXECUTE_ABI = [
+    {
+        "type": "function",
+        "name": "execute",
+        "stateMutability": "nonpayable",
+        "inputs": [
+            {"name": "target", "type": "address"},
+            {"name": "value", "type": "uint256"},
+            {"name": "data", "type": "bytes"},
+        ],
+        "outputs": [],
+    }
+]
+
+
+@pytest.fixture
+def packed_user_op():
+    return (
+        SIMPLE_ACCOUNT_ADDRESS,
+        7,
+        b"",
+        _encode_execute(TARGET_ADDRESS, 1, "0x1234"),
+        _pack_uint128_pair(100_000, 200_000),
+        50_000,
+        _pack_uint128_pair(1_000_000_000, 2_000_000_000),
+        b"",
+        b"signature",
+    )
+
+
+def test_user_op_hash_matches_eip712(packed_user_op):
+    typed_data = {
+        "types": {
+            "EIP712Domain": [
+                {"name": "name", "type": "string"},
+                {"name": "version", "type": "string"},
+                {"name": "chainId", "type": "uint256"},
+                {"name": "verifyingContract", "type": "address"},
+            ],
+            "PackedUserOperation": [
+                {"name": "sender", "type": "address"},
+                {"name": "nonce", "type": "uint256"},
+                {"name": "initCode", "type": "bytes"},
+                {"name": "callData", "type": "bytes"},
+                {"name": "accountGasLimits", "type": "bytes32"},
+                {"name": "preVerificationGas", "type": "uint256"},
+                {"name": "gasFees", "type": "bytes32"},
+                {"name": "paymasterAndData", "type": "bytes"},
+            ],
+        },
+        "primaryType": "PackedUserOperation",
+        "domain": {
+            "name": "ERC4337",
+            "version": "1",
+            "chainId": 31337,
+            "verifyingContract": ENTRY_POINT_ADDRESS,
+        },
+        "message": {
+            "sender": packed_user_op[0],
+            "nonce": packed_user_op[1],
+            "initCode": packed_user_op[2],
+            "callData": packed_user_op[3],
+            "accountGasLimits": packed_user_op[4],
+            "preVerificationGas": packed_user_op[5],
+            "gasFees": packed_user_op[6],
+            "paymasterAndData": packed_user_op[7],
+        },
+    }
+    message = encode_typed_data(full_message=typed_data)
+    expected = keccak(b"\x19" + message.version + message.header + message.body)
+
+    assert _user_op_hash(packed_user_op, ENTRY_POINT_ADDRESS, 31337) == expected
+
+
+def test_user_op_hash_ignores_signature(packed_user_op):
+    resigned = packed_user_op[:-1] + (b"other signature",)
+
+    assert _user_op_hash(resigned, ENTRY_POINT_ADDRESS, 31337) == _user_op_hash(
+        packed_user_op, ENTRY_POINT_ADDRESS, 31337
+    )
+
+
+def test_user_op_hash_depends_on_chain_id(packed_user_op):
+    assert _user_op_hash(packed_user_op, ENTRY_POINT_ADDRESS, 1) != _user_op_hash(
+        packed_user_op, ENTRY_POINT_ADDRESS, 31337
+    )
+
+
+def test_pack_uint128_pair():
+    packed = _pack_uint128_pair(100_000, (1 << 128) - 1)
+
+    assert len(packed) == 32
+    assert packed == (100_000).to_bytes(16, "big") + ((1 << 128) - 1).to_bytes(
+        16, "big"
+    )
+
+
+@pytest.mark.parametrize("high,low", [(1 << 128, 0), (0, 1 << 128), (-1, 0)])
+def test_pack_uint128_pair_out_of_range(high, low):
+    with pytest.raises(ValueError):
+        _pack_uint128_pair(high, low)
+
+
+def test_encode_execute_matches_abi():
+    simple_account = Web3().eth.contract(abi=EXECUTE_ABI)
+
+    assert _encode_execute(TARGET_ADDRESS, 10**18, "0x1234") == bytes.fromhex(
+        simple_account.encode_abi("execute", [TARGET_ADDRESS, 10**18, b"\x12\x34"])[2:]
+    )
+
+
+def test_encode_execute_round_trip():
+    call_data = _encode_execute(TARGET_ADDRESS, 5, "0xdeadbeef")
+
+    assert call_data[:4] == EXECUTE_SELECTOR
+    assert decode(["address", "uint256", "bytes"], call_data[4:]) == (
+        TARGET_ADDRESS.lower(),
+        5,
+        bytes.fromhex("deadbeef"),
+    )
+
+
+def receipt(txn_hash):
+    return {"transactionHash": txn_hash, "status": 1}
+
+
+def test_receipt_waiter_shares_one_subscription(persistent_w3):
+    hashes = [HexBytes(b"\x01" * 32), HexBytes(b"\x02" * 32)]
+
+    async def scenario():
+        waiter = _ReceiptWaiter(persistent_w3)
+        waits = [asyncio.create_task(waiter.wait(txn_hash)) for txn_hash in hashes]
+        while len(waiter._pending) < 2 or waiter._watcher is None:
+            await asyncio.sleep(0)
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+        for txn_hash in hashes:
+            persistent_w3.eth.receipts[txn_hash] = receipt(txn_hash)
+        await persistent_w3.socket.heads.put({"number": 1})
+        return waiter, await asyncio.gather(*waits)
+
+    waiter, receipts = asyncio.run(scenario())
+
+    assert receipts == [receipt(txn_hash) for txn_hash in hashes]
+    assert persistent_w3.eth.subscriptions == ["newHeads"]
+    assert persistent_w3.eth.unsubscribed == ["0x1"]
+    assert waiter._watcher is None
+    assert waiter._subscription_id is None
+
+
+def test_receipt_waiter_returns_already_mined_receipt(persistent_w3):
+    txn_hash = HexBytes(b"\x01" * 32)
+    persistent_w3.eth.receipts[txn_hash] = receipt(txn_hash)
+
+    waiter = _ReceiptWaiter(persistent_w3)
+    assert asyncio.run(waiter.wait(txn_hash)) == receipt(txn_hash)
+    assert persistent_w3.eth.unsubscribed == ["0x1"]
+
+
+def test_receipt_waiter_times_out(persistent_w3):
+    waiter = _ReceiptWaiter(persistent_w3)
+
+    with pytest.raises(TimeExhausted):
+        asyncio.run(waiter.wait(HexBytes(b"\x01" * 32), timeout=0.01))
+    assert persistent_w3.eth.unsubscribed == ["0x1"]
+    assert not waiter._pending
+
+
+def test_receipt_waiter_polls_without_persistent_provider():
+    w3 = FakeAsyncWeb3(provider=None)
+    txn_hash = HexBytes(b"\x01" * 32)
+    w3.eth.receipts[txn_hash] = receipt(txn_hash)
+
+    assert asyncio.run(_ReceiptWaiter(w3).wait(txn_hash)) == receipt(txn_hash)
+    assert w3.eth.polled == [txn_hash]
+    assert w3.eth.subscriptions == []
+
+
+def test_tx_cache_gas_price_expires(clock):
+    cache = _BundlerTxCache(gas_price_ttl=12)
+    assert cache.get_gas_price() is None
+
+    cache.set_gas_price(7)
+    clock[0] += 11.5
+    assert cache.get_gas_price() == 7
+
+    clock[0] += 0.5
+    assert cache.get_gas_price() is None
+
+
+def test_tx_cache_sent_advances_nonce():
+    cache = _BundlerTxCache()
+    assert cache.get_nonce(BUNDLER.address) is None
+
+    cache.sent(BUNDLER.address, 4)
+    assert cache.get_nonce(BUNDLER.address) == 5
+    cache.sent(BUNDLER.address, 5)
+    assert cache.get_nonce(BUNDLER.address) == 6
+    assert cache.get_nonce(OWNER.address) is None
+
+
+def test_tx_cache_rejected(clock):
+    cache = _BundlerTxCache()
+    cache.set_gas_price(7)
+    cache.sent(BUNDLER.address, 4)
+    cache.sent(OWNER.address, 9)
+
+    cache.rejected(BUNDLER.address)
+
+    assert cache.get_nonce(BUNDLER.address) is None
+    assert cache.get_gas_price() is None
+    assert cache.get_nonce(OWNER.address) == 10
+
+
+async def _value(value):
+    return value
+
+
+class FakeContractCall:
+    def __init__(self, result):
+        self.result = result
+
+    async def call(self):
+        return self.result
+
+    async def build_transaction(self, transaction):
+        return {**transaction, "to": ENTRY_POINT_ADDRESS, "value": 0, "data": b""}
+
+
+class FakeEntryPointFunctions:
+    def getNonce(self, sender, key):
+        return FakeContractCall(0)
+
+    def handleOps(self, ops, beneficiary):
+        return FakeContractCall(None)
+
+
+class FakeEntryPoint:
+    address = ENTRY_POINT_ADDRESS
+    functions = FakeEntryPointFunctions()
+
+
+class FakeBatch:
+    def __init__(self):
+        self.requests = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def add(self, request):
+        self.requests.append(request)
+
+    async def async_execute(self):
+        return [
+            await (request.call() if hasattr(request, "call") else request)
+            for request in self.requests
+        ]
+
+
+class FakeOperationEth(FakeAsyncEth):
+    account = Account
+
+    def __init__(self):
+        super().__init__()
+        self.reads = []
+        self.sent = []
+        self.reject = False
+
+    async def get_transaction_count(self, address):
+        self.reads.append("nonce")
+        return 3
+
+    @property
+    def gas_price(self):
+        self.reads.append("gas_price")
+        return _value(10**9)
+
+    @property
+    def chain_id(self):
+        self.reads.append("chain_id")
+        return _value(31337)
+
+    async def send_raw_transaction(self, raw_transaction):
+        if self.reject:
+            raise ValueError("nonce too low")
+        self.sent.append(raw_transaction)
+        txn_hash = HexBytes(keccak(raw_transaction))
+        self.receipts[txn_hash] = {"status": 1, "logs": []}
+        return txn_hash
+
+
+class FakeOperationWeb3(FakeAsyncWeb3):
+    def __init__(self):
+        super().__init__(provider=None)
+        self.eth = FakeOperationEth()
+
+    def batch_requests(self):
+        return FakeBatch()
+
+
+@pytest.fixture
+def operation_manager():
+    accounts = SimpleNamespace(owner=OWNER, bundler=BUNDLER, beneficiary=OWNER)
+    contracts = SimpleNamespace(
+        entry_point=FakeEntryPoint(),
+        simple_account=SimpleNamespace(address=SIMPLE_ACCOUNT_ADDRESS),
+    )
+    manager = AsyncUserOperationManager(FakeOperationWeb3(), accounts, contracts)
+    manager._entry_point = FakeEntryPoint()
+    return manager
+
+
+def test_execute_operation_reuses_nonce_and_gas_price(operation_manager):
+    eth = operation_manager.w3.eth
+
+    async def scenario():
+        for _ in range(2):
+            await operation_manager.execute_operation(TARGET_ADDRESS, 0, "0x")
+
+    asyncio.run(scenario())
+
+    assert sorted(eth.reads) == ["chain_id", "gas_price", "nonce"]
+    assert [
+        TypedTransaction.from_bytes(HexBytes(raw)).as_dict()["nonce"]
+        for raw in eth.sent
+    ] == [3, 4]
+
+
+def test_execute_operation_refetches_after_rejected_send(operation_manager):
+    eth = operation_manager.w3.eth
+
+    async def scenario():
+        await operation_manager.execute_operation(TARGET_ADDRESS, 0, "0x")
+        eth.reject = True
+        with pytest.raises(Exception, match="Error sending transaction"):
+            await operation_manager.execute_operation(TARGET_ADDRESS, 0, "0x")
+        eth.reject = False
+        await operation_manager.execute_operation(TARGET_ADDRESS, 0, "0x")
+
+    asyncio.run(scenario())
+
+    assert sorted(eth.reads) == ["chain_id", "gas_price", "gas_price", "nonce", "nonce"]